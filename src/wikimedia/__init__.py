@@ -1 +1,2 @@
 __version__ = '0.2.0'
+from .utils import iter_articles as iter_articles
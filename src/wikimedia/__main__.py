@@ -1,44 +1,188 @@
 import pathlib
+import socket
 import sys
 from argparse import ArgumentParser, Namespace
-from .dtypes import Convert as settings_conv, Metadata as settings_meta
-from .modes import Convert as app_conv, Metadata as app_meta
+from .dtypes import Benchmark as settings_bench, Convert as settings_conv, Lookup as settings_look, Merge as settings_merge, Metadata as settings_meta, Plan as settings_plan, Worker as settings_work
+from .modes import Benchmark as app_bench, Convert as app_conv, Lookup as app_look, Merge as app_merge, Metadata as app_meta, Plan as app_plan, Worker as app_work
 
 def main() -> None:
     parser = ArgumentParser(prog = 'wikimedia', description = "Tools to work with Wikimedia's dump files")
     subparsers = parser.add_subparsers(help = 'sub-commands')
     metadata_parser(subparsers.add_parser('metadata', help = 'Extracts the metadata from the corpus'))
     convert_parser(subparsers.add_parser('convert', help = 'Convert the data to our standard format'))
+    lookup_parser(subparsers.add_parser('lookup', help = 'Print one article of the converted data'))
+    plan_parser(subparsers.add_parser('plan', help = 'Split the conversion into tasks for workers on several machines'))
+    worker_parser(subparsers.add_parser('worker', help = 'Convert the tasks of a plan until there are none left'))
+    merge_parser(subparsers.add_parser('merge', help = 'Gather the output of every task of a plan into our standard format'))
+    benchmark_parser(subparsers.add_parser('benchmark', help = 'Measure the throughput on a synthetic dump'))
     args = parser.parse_args()
     print_args(args)
     args.run(args)
 
 def metadata_parser(parser: ArgumentParser) -> None:
     def run(args: Namespace) -> None:
-        set = settings_meta(args.source, args.dest, args.log)
+        set = settings_meta(args.source, args.dest, args.log, args.workers, args.shards, args.index, args.log_bytes, args.log_compress, args.stats, args.profile, args.ids_file, args.title_regex, args.namespaces, args.sample_rate, args.seed, args.limit, args.quiet, args.progress, args.read_queue, args.read_block, args.write_queue, args.write_block)
         app = app_meta(set)
         app.init()
         app.run()
-    parser.add_argument('-source', type = pathlib.Path, required = True, help = "The .xml file sourced from Wikimedia")
+    parser.add_argument('-source', type = pathlib.Path, required = True, help = "The .xml or .xml.bz2 file sourced from Wikimedia")
     parser.add_argument('-dest', type = pathlib.Path, required = True, help = "The CSV file used to store the metadata")
-    parser.add_argument('-log', type = pathlib.Path, help = 'The folder of raw XML chunks that did not process')
+    parser.add_argument('-log', type = pathlib.Path, help = 'The folder for the log of revisions that did not process')
+    parser.add_argument('-workers', type = int, default = 1, help = 'The number of processes used to extract the articles')
+    parser.add_argument('-shards', type = int, default = 1, help = 'The number of byte ranges the source is split into')
+    parser.add_argument('-index', type = pathlib.Path, help = 'The multistream index file that goes with a .xml.bz2 source')
+    parser.add_argument('-log_bytes', type = int, default = 100000000, help = 'The size in bytes the error log is started over in a new file at')
+    parser.add_argument('-log_compress', action = 'store_true', help = 'Compress the error log with gzip')
+    parser.add_argument('-stats', type = pathlib.Path, help = 'The JSON file the per stage timings and counts are written to')
+    parser.add_argument('-profile', action = 'store_true', help = 'Sample the hot paths and add them to the stats file')
+    parser.add_argument('-ids_file', type = pathlib.Path, help = 'A file with one page id per line, only those pages are kept')
+    parser.add_argument('-title_regex', type = str, help = 'Only keep the pages with a title that matches the regular expression')
+    parser.add_argument('-namespaces', type = int, nargs = '+', help = 'The namespaces the pages are kept from, instead of 0')
+    parser.add_argument('-sample_rate', type = float, default = 1.0, help = 'The share of the pages kept, picked by a hash of the seed and page id')
+    parser.add_argument('-seed', type = int, default = 0, help = 'The seed of the sample')
+    parser.add_argument('-limit', type = int, default = 0, help = 'The most articles kept, 0 turns it off')
+    parser.add_argument('-quiet', action = 'store_true', help = 'Print a plain progress line now and then instead of a progress bar')
+    parser.add_argument('-progress', type = float, default = 0, help = 'The seconds between progress updates, 0 uses 1 for the bar and 60 when quiet')
+    parser.add_argument('-read_queue', type = int, default = 4, help = 'The number of blocks read ahead on a background thread, 0 reads on the main thread')
+    parser.add_argument('-read_block', type = int, default = 1048576, help = 'The size in bytes of each block read from the source')
+    parser.add_argument('-write_queue', type = int, default = 4, help = 'The number of blocks waiting to be written by a background thread, 0 writes on the main thread')
+    parser.add_argument('-write_block', type = int, default = 1048576, help = 'The size in bytes of each block handed to the background writer')
     parser.set_defaults(run = run)
     parser.set_defaults(cmd = 'metadata')
 
 def convert_parser(parser: ArgumentParser) -> None:
     def run(args: Namespace) -> None:
-        set = settings_conv(args.source, args.dest, args.lines, args.dest_pattern, args.log)
+        set = settings_conv(args.source, args.dest, args.lines, args.dest_pattern, args.log, args.workers, args.shards, args.index, args.checkpoint, args.resume, args.manifest, args.previous, args.bytes, args.partitions, args.log_bytes, args.log_compress, args.stats, args.profile, args.metadata, args.history, args.ids_file, args.title_regex, args.namespaces, args.sample_rate, args.seed, args.limit, args.quiet, args.progress, tokenizer = args.tokenizer, read_queue = args.read_queue, read_block = args.read_block, write_queue = args.write_queue, write_block = args.write_block)
         app = app_conv(set)
         app.init()
         app.run()
-    parser.add_argument('-source', type = pathlib.Path, required = True, help = 'The .xml file sourced from Wikimedia')
+    parser.add_argument('-source', type = pathlib.Path, required = True, help = 'The .xml or .xml.bz2 file sourced from Wikimedia')
     parser.add_argument('-dest', type = pathlib.Path, required = True, help = 'The folder for the converted TXT files')
     parser.add_argument('-lines', type = int, default = 1000000, help = 'The number of lines per TXT file')
     parser.add_argument('-dest_pattern',  type = str, default = 'wikimedia.{id:04}.txt', help = 'The format of the TXT file name')
-    parser.add_argument('-log', type = pathlib.Path, help = 'The folder of raw XML chunks that did not process')
+    parser.add_argument('-log', type = pathlib.Path, help = 'The folder for the log of revisions that did not process')
+    parser.add_argument('-workers', type = int, default = 1, help = 'The number of processes used to extract the articles')
+    parser.add_argument('-shards', type = int, default = 1, help = 'The number of byte ranges the source is split into')
+    parser.add_argument('-index', type = pathlib.Path, help = 'The multistream index file that goes with a .xml.bz2 source')
+    parser.add_argument('-checkpoint', type = int, default = 10000, help = 'The number of articles between checkpoints, 0 turns them off')
+    parser.add_argument('-resume', action = 'store_true', help = 'Continue from the last checkpoint in dest')
+    parser.add_argument('-manifest', action = 'store_true', help = 'Write the id, revision, sha1 and location of each article to a manifest')
+    parser.add_argument('-previous', type = pathlib.Path, help = 'The manifest of an earlier run to copy unchanged articles from')
+    parser.add_argument('-bytes', type = int, default = 0, help = 'The target size of each TXT file in bytes, 0 turns it off')
+    parser.add_argument('-partitions', type = int, default = 1, help = 'The number of partitions the articles are split into by page id')
+    parser.add_argument('-log_bytes', type = int, default = 100000000, help = 'The size in bytes the error log is started over in a new file at')
+    parser.add_argument('-log_compress', action = 'store_true', help = 'Compress the error log with gzip')
+    parser.add_argument('-stats', type = pathlib.Path, help = 'The JSON file the per stage timings and counts are written to')
+    parser.add_argument('-profile', action = 'store_true', help = 'Sample the hot paths and add them to the stats file')
+    parser.add_argument('-metadata', type = pathlib.Path, help = 'The CSV file the metadata is written to in the same pass')
+    parser.add_argument('-history', action = 'store_true', help = 'Only decode the text of the revision that is kept, for full history dumps')
+    parser.add_argument('-ids_file', type = pathlib.Path, help = 'A file with one page id per line, only those pages are kept')
+    parser.add_argument('-title_regex', type = str, help = 'Only keep the pages with a title that matches the regular expression')
+    parser.add_argument('-namespaces', type = int, nargs = '+', help = 'The namespaces the pages are kept from, instead of 0')
+    parser.add_argument('-sample_rate', type = float, default = 1.0, help = 'The share of the pages kept, picked by a hash of the seed and page id')
+    parser.add_argument('-seed', type = int, default = 0, help = 'The seed of the sample')
+    parser.add_argument('-limit', type = int, default = 0, help = 'The most articles kept, 0 turns it off')
+    parser.add_argument('-quiet', action = 'store_true', help = 'Print a plain progress line now and then instead of a progress bar')
+    parser.add_argument('-progress', type = float, default = 0, help = 'The seconds between progress updates, 0 uses 1 for the bar and 60 when quiet')
+    parser.add_argument('-read_queue', type = int, default = 4, help = 'The number of blocks read ahead on a background thread, 0 reads on the main thread')
+    parser.add_argument('-read_block', type = int, default = 1048576, help = 'The size in bytes of each block read from the source')
+    parser.add_argument('-write_queue', type = int, default = 4, help = 'The number of blocks waiting to be written by a background thread, 0 writes on the main thread')
+    parser.add_argument('-write_block', type = int, default = 1048576, help = 'The size in bytes of each block handed to the background writer')
+    parser.add_argument('-tokenizer', type = str, help = 'Also write each TXT file as a binary shard of tokens, using bytes or a module:function tokenizer')
     parser.set_defaults(run = run)
     parser.set_defaults(cmd = 'convert')
 
+def lookup_parser(parser: ArgumentParser) -> None:
+    def run(args: Namespace) -> None:
+        set = settings_look(args.source, args.id, args.title, args.metadata)
+        app = app_look(set)
+        app.init()
+        app.run()
+    parser.add_argument('-source', type = pathlib.Path, required = True, help = 'The folder of the converted TXT files')
+    parser.add_argument('-id', type = int, help = 'The page id of the article')
+    parser.add_argument('-title', type = str, help = 'The title of the article')
+    parser.add_argument('-metadata', type = pathlib.Path, help = 'The CSV file from the metadata process, needed to look up a title')
+    parser.set_defaults(run = run)
+    parser.set_defaults(cmd = 'lookup')
+
+def plan_parser(parser: ArgumentParser) -> None:
+    def run(args: Namespace) -> None:
+        set = settings_plan(args.source, args.queue, args.tasks, args.lines, args.dest_pattern, args.index, args.checkpoint, args.manifest, args.previous, args.bytes, args.partitions, args.metadata, args.history, args.ids_file, args.title_regex, args.namespaces, args.sample_rate, args.seed)
+        app = app_plan(set)
+        app.init()
+        app.run()
+    parser.add_argument('-source', type = pathlib.Path, required = True, help = 'The .xml or .xml.bz2 file sourced from Wikimedia, on a filesystem every worker can read')
+    parser.add_argument('-queue', type = pathlib.Path, required = True, help = 'The folder on a shared filesystem the tasks are written to')
+    parser.add_argument('-tasks', type = int, required = True, help = 'The number of byte ranges the source is split into, one per task')
+    parser.add_argument('-lines', type = int, default = 1000000, help = 'The number of lines per TXT file')
+    parser.add_argument('-dest_pattern',  type = str, default = 'wikimedia.{id:04}.txt', help = 'The format of the TXT file name')
+    parser.add_argument('-index', type = pathlib.Path, help = 'The multistream index file that goes with a .xml.bz2 source')
+    parser.add_argument('-checkpoint', type = int, default = 10000, help = 'The number of articles between the checkpoints of each task, 0 turns them off')
+    parser.add_argument('-manifest', action = 'store_true', help = 'Write the id, revision, sha1 and location of each article to a manifest')
+    parser.add_argument('-previous', type = pathlib.Path, help = 'The manifest of an earlier run to copy unchanged articles from')
+    parser.add_argument('-bytes', type = int, default = 0, help = 'The target size of each TXT file in bytes, 0 turns it off')
+    parser.add_argument('-partitions', type = int, default = 1, help = 'The number of partitions the articles are split into by page id')
+    parser.add_argument('-metadata', type = pathlib.Path, help = 'The CSV file merge writes the metadata to')
+    parser.add_argument('-history', action = 'store_true', help = 'Only decode the text of the revision that is kept, for full history dumps')
+    parser.add_argument('-ids_file', type = pathlib.Path, help = 'A file with one page id per line, only those pages are kept')
+    parser.add_argument('-title_regex', type = str, help = 'Only keep the pages with a title that matches the regular expression')
+    parser.add_argument('-namespaces', type = int, nargs = '+', help = 'The namespaces the pages are kept from, instead of 0')
+    parser.add_argument('-sample_rate', type = float, default = 1.0, help = 'The share of the pages kept, picked by a hash of the seed and page id')
+    parser.add_argument('-seed', type = int, default = 0, help = 'The seed of the sample')
+    parser.set_defaults(run = run)
+    parser.set_defaults(cmd = 'plan')
+
+def worker_parser(parser: ArgumentParser) -> None:
+    def run(args: Namespace) -> None:
+        set = settings_work(args.queue, args.name, args.steal_after, args.workers, args.log, args.log_bytes, args.log_compress, args.profile, args.quiet, args.progress, args.read_queue, args.read_block, args.write_queue, args.write_block)
+        app = app_work(set)
+        app.init()
+        app.run()
+    parser.add_argument('-queue', type = pathlib.Path, required = True, help = 'The folder of tasks written by plan')
+    parser.add_argument('-name', type = str, default = socket.gethostname(), help = 'The name the tasks are claimed under, the host name unless several workers run on one machine')
+    parser.add_argument('-steal_after', type = float, default = 0, help = 'The seconds after which the task of a worker that stopped touching its claim is taken over, 0 never takes one over')
+    parser.add_argument('-workers', type = int, default = 1, help = 'The number of processes used to extract the articles')
+    parser.add_argument('-log', type = pathlib.Path, help = 'The folder for the log of revisions that did not process')
+    parser.add_argument('-log_bytes', type = int, default = 100000000, help = 'The size in bytes the error log is started over in a new file at')
+    parser.add_argument('-log_compress', action = 'store_true', help = 'Compress the error log with gzip')
+    parser.add_argument('-profile', action = 'store_true', help = 'Sample the hot paths and add them to the stats file of each task')
+    parser.add_argument('-quiet', action = 'store_true', help = 'Print a plain progress line now and then instead of a progress bar')
+    parser.add_argument('-progress', type = float, default = 0, help = 'The seconds between progress updates, 0 uses 1 for the bar and 60 when quiet')
+    parser.add_argument('-read_queue', type = int, default = 4, help = 'The number of blocks read ahead on a background thread, 0 reads on the main thread')
+    parser.add_argument('-read_block', type = int, default = 1048576, help = 'The size in bytes of each block read from the source')
+    parser.add_argument('-write_queue', type = int, default = 4, help = 'The number of blocks waiting to be written by a background thread, 0 writes on the main thread')
+    parser.add_argument('-write_block', type = int, default = 1048576, help = 'The size in bytes of each block handed to the background writer')
+    parser.set_defaults(run = run)
+    parser.set_defaults(cmd = 'worker')
+
+def merge_parser(parser: ArgumentParser) -> None:
+    def run(args: Namespace) -> None:
+        set = settings_merge(args.queue, args.dest, args.log)
+        app = app_merge(set)
+        app.init()
+        app.run()
+    parser.add_argument('-queue', type = pathlib.Path, required = True, help = 'The folder of tasks written by plan, with every task done')
+    parser.add_argument('-dest', type = pathlib.Path, required = True, help = 'The folder for the converted TXT files')
+    parser.add_argument('-log', type = pathlib.Path, help = 'The folder the workers logged to, the log of each task is combined into it')
+    parser.set_defaults(run = run)
+    parser.set_defaults(cmd = 'merge')
+
+def benchmark_parser(parser: ArgumentParser) -> None:
+    def run(args: Namespace) -> None:
+        set = settings_bench(args.dest, args.pages, args.revisions, args.markup, args.seed, args.repeat, args.history)
+        app = app_bench(set)
+        app.init()
+        app.run()
+    parser.add_argument('-dest', type = pathlib.Path, required = True, help = 'The JSON file used to store the results')
+    parser.add_argument('-pages', type = int, default = 2000, help = 'The number of pages in the synthetic dump')
+    parser.add_argument('-revisions', type = int, default = 3, help = 'The most revisions a synthetic page can have')
+    parser.add_argument('-markup', type = float, default = 0.3, help = 'The chance each synthetic sentence gets a piece of markup')
+    parser.add_argument('-seed', type = int, default = 0, help = 'The seed used to make the synthetic dump')
+    parser.add_argument('-repeat', type = int, default = 3, help = 'The number of times each benchmark is run')
+    parser.add_argument('-history', type = int, default = 20000, help = 'The number of revisions of the synthetic page used to check the peak memory')
+    parser.set_defaults(run = run)
+    parser.set_defaults(cmd = 'benchmark')
+
 def print_args(args: Namespace) -> None:
     print(f'--- {args.cmd} ---')
     for key in args.__dict__.keys():
@@ -0,0 +1,59 @@
+import typing as t
+
+Value = int | str | t.List[str]
+Layout = t.Dict[str, int]
+
+class Article(t.Mapping[str, Value]):
+    __slots__ = ('_layout', '_values')
+
+    def __init__(self, layout: Layout, values: t.Tuple[Value | None, ...]):
+        """
+        The extracted fields of one article, read the same as a `dict`
+
+        Parameters
+        ----------
+        layout : Dict[str, int]
+            The position of each field in `values`, one layout is shared by every article of a run
+        values : Tuple
+            The value of each field, None when the field was not found
+            A field whose value is None is left out, the same as a missing key.
+        """
+        self._layout = layout
+        self._values = values
+
+    def __reduce__(self):
+        # The layout is the same object for every article of a batch, so pickle only sends it once
+        return (Article, (self._layout, self._values))
+
+    @staticmethod
+    def layout(names: t.Iterable[str]) -> Layout:
+        """
+        Gets the layout that puts the fields in the order of `names`
+        """
+        return {name: i for i, name in enumerate(names)}
+
+    def __getitem__(self, name: str) -> Value:
+        i = self._layout.get(name)
+        value = None if i is None else self._values[i]
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def get(self, name: str, default: t.Any = None) -> t.Any:
+        i = self._layout.get(name)
+        value = None if i is None else self._values[i]
+        return default if value is None else value
+
+    def __contains__(self, name: object) -> bool:
+        i = self._layout.get(t.cast(str, name))
+        return i is not None and self._values[i] is not None
+
+    def __iter__(self) -> t.Iterator[str]:
+        values = self._values
+        return (name for name, i in self._layout.items() if values[i] is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for value in self._values if value is not None)
+
+    def __repr__(self) -> str:
+        return f'Article({dict(self)!r})'
@@ -0,0 +1,74 @@
+import pathlib
+
+class Benchmark:
+
+    def __init__(self, dest: pathlib.Path, pages: int, revisions: int, markup: float, seed: int, repeat: int, history: int = 20000):
+        """
+        Settings for benchmark process
+
+        Parameters
+        ----------
+        dest : pathlib.Path
+            The JSON file used to store the results
+        pages: int
+            The number of pages in the synthetic dump
+        revisions: int
+            The most revisions a synthetic page can have
+        markup: float
+            The chance each synthetic sentence gets a piece of markup
+        seed: int
+            The seed used to make the synthetic dump
+        repeat: int
+            The number of times each benchmark is run, the fastest time is kept
+        history: int
+            The number of revisions of the synthetic page used to check the peak memory of a full history dump
+        """
+        self._dest = dest
+        self._pages = pages
+        self._revisions = revisions
+        self._markup = markup
+        self._seed = seed
+        self._repeat = repeat
+        self._history = history
+
+    @property
+    def dest(self) -> pathlib.Path:
+        return self._dest
+    @property
+    def pages(self) -> int:
+        return self._pages
+    @property
+    def revisions(self) -> int:
+        return self._revisions
+    @property
+    def markup(self) -> float:
+        return self._markup
+    @property
+    def seed(self) -> int:
+        return self._seed
+    @property
+    def repeat(self) -> int:
+        return self._repeat
+    @property
+    def history(self) -> int:
+        return self._history
+
+    def validate(self) -> None:
+        """
+        Ensures the settings have face validity
+        """
+        def _folder(path: pathlib.Path) -> None:
+            if not path.exists():
+                raise ValueError(f'{str(path)} is does not exist')
+            if not path.is_dir():
+                raise ValueError(f'{str(path)} is not a folder')
+        def _nonzero_int(val: int):
+            if val <= 0:
+                raise ValueError(f'{val} must be > 0')
+        _folder(self._dest.parent)
+        _nonzero_int(self._pages)
+        _nonzero_int(self._revisions)
+        _nonzero_int(self._repeat)
+        _nonzero_int(self._history)
+        if self._markup < 0 or self._markup > 1:
+            raise ValueError(f'{self._markup} must be between 0 and 1')
@@ -0,0 +1,77 @@
+import json
+import os
+import pathlib
+import typing as t
+
+class Checkpoint:
+
+    def __init__(self, page: int, files: t.List[t.List[int]], manifest: int = 0, stats: t.Dict[int, t.List[int]] | None = None, index: int = 0, metadata: int = 0, source: int = 0):
+        """
+        The state of the convert process right after an article was saved
+
+        Parameters
+        ----------
+        page : int
+            The id of the last page saved
+        files : List[List[int]]
+            For each partition, the `id` of the TXT file being written to, the number of lines already in it and its size in bytes.
+            The size is 0 when the partition has no open file and `id` is the next file it will write.
+        manifest : int
+            The number of bytes already in the manifest, 0 when there is none
+        stats : Dict[int, List[int]]
+            For each TXT file `id`, its bytes, lines, articles, first page id and last page id
+        index : int
+            The number of bytes already in the work file of the article index
+        metadata : int
+            The number of bytes already in the metadata CSV, 0 when there is none
+        source : int
+            How far the source had been read, in bytes of the file, so the page `page` ends before it
+            A resume searches back from it for the page, 0 searches from the start of the source.
+        """
+        self._page = page
+        self._files = files
+        self._manifest = manifest
+        self._stats = {} if stats is None else stats
+        self._index = index
+        self._metadata = metadata
+        self._source = source
+
+    @property
+    def page(self) -> int:
+        return self._page
+    @property
+    def files(self) -> t.List[t.List[int]]:
+        return self._files
+    @property
+    def manifest(self) -> int:
+        return self._manifest
+    @property
+    def stats(self) -> t.Dict[int, t.List[int]]:
+        return self._stats
+    @property
+    def index(self) -> int:
+        return self._index
+    @property
+    def metadata(self) -> int:
+        return self._metadata
+    @property
+    def source(self) -> int:
+        return self._source
+
+    def save(self, path: pathlib.Path) -> None:
+        """
+        Writes the checkpoint so that a crash part way through never leaves a broken file behind
+        """
+        temp = path.with_name(f'{path.name}.tmp')
+        with open(temp, 'w', encoding = 'utf-8') as fp:
+            json.dump({'page': self._page, 'files': self._files, 'manifest': self._manifest, 'stats': self._stats, 'index': self._index, 'metadata': self._metadata, 'source': self._source}, fp)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(temp, path)
+
+    @staticmethod
+    def load(path: pathlib.Path) -> 'Checkpoint':
+        with open(path, 'r', encoding = 'utf-8') as fp:
+            state = json.load(fp)
+        stats = {int(k): v for k, v in state['stats'].items()}
+        return Checkpoint(state['page'], state['files'], state['manifest'], stats, state.get('index', 0), state.get('metadata', 0), state.get('source', 0))
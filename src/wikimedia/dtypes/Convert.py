@@ -1,15 +1,17 @@
 import pathlib
+import re
+import typing as t
 
 class Convert:
 
-    def __init__(self, source: pathlib.Path, dest: pathlib.Path, lines: int, dest_pattern: str, log: pathlib.Path):
+    def __init__(self, source: pathlib.Path, dest: pathlib.Path, lines: int, dest_pattern: str, log: pathlib.Path, workers: int = 1, shards: int = 1, index: pathlib.Path | None = None, checkpoint: int = 10000, resume: bool = False, manifest: bool = False, previous: pathlib.Path | None = None, bytes: int = 0, partitions: int = 1, log_bytes: int = 100000000, log_compress: bool = False, stats: pathlib.Path | None = None, profile: bool = False, metadata: pathlib.Path | None = None, history: bool = False, ids_file: pathlib.Path | None = None, title_regex: str | None = None, namespaces: t.List[int] | None = None, sample_rate: float = 1.0, seed: int = 0, limit: int = 0, quiet: bool = False, progress: float = 0, span: t.Tuple[int, int] | None = None, tokenizer: str | None = None, read_queue: int = 4, read_block: int = 1048576, write_queue: int = 4, write_block: int = 1048576):
         """
         Settings for convert process
 
         Parameters
         ----------
         source : pathlib.Path
-            The .xml file sourced from Wikimedia
+            The .xml or multistream .xml.bz2 file sourced from Wikimedia
         dest : pathlib.Path
             The folder for the converted TXT files
         lines: int
@@ -17,13 +19,100 @@ class Convert:
         dest_pattern: str
             The format of the TXT file name
         log: pathlib.Path
-            The folder of raw XML chunks that did not process
+            The folder for the log of revisions that did not process
+        workers: int
+            The number of processes used to extract the articles
+        shards: int
+            The number of byte ranges the source is split into so each worker can parse its own range
+        index: pathlib.Path
+            The multistream index file that goes with a .xml.bz2 source
+        checkpoint: int
+            The number of articles between checkpoints, 0 turns them off
+        resume: bool
+            Continue from the last checkpoint in `dest` instead of starting over
+        manifest: bool
+            Write the page id, revision id, sha1 and location of each article to a manifest in `dest`
+        previous: pathlib.Path
+            The manifest of an earlier run, unchanged articles are copied from its TXT files
+        bytes: int
+            The target size of each TXT file in bytes, 0 turns it off
+        partitions: int
+            The number of partitions the articles are split into by page id
+        log_bytes: int
+            The size in bytes the error log is started over in a new file at
+        log_compress: bool
+            Compress the error log with gzip
+        stats: pathlib.Path
+            The JSON file the per stage timings, skip counts and error counts are written to during and after the run
+        profile: bool
+            Sample the stack while running and add the hot paths to `stats`
+        metadata: pathlib.Path
+            The CSV file the metadata is written to in the same pass, the same as the metadata process makes
+        history: bool
+            Read the source with the byte scanner so only the text of the revision that is kept is decoded, for full history dumps
+        ids_file: pathlib.Path
+            A file with one page id per line, only those pages are kept
+        title_regex: str
+            Only the pages with a title that matches the regular expression are kept
+        namespaces: List[int]
+            The namespaces the pages are kept from instead of only the articles in namespace 0
+        sample_rate: float
+            The share of the pages kept, picked by a hash of `seed` and the page id
+        seed: int
+            The seed of the sample
+        limit: int
+            The most articles kept, 0 turns it off
+        quiet: bool
+            Print a plain progress line now and then instead of a progress bar, for logs
+        progress: float
+            The seconds between progress updates, 0 uses 1 for the bar and 60 when quiet
+        span: Tuple[int, int]
+            The byte range of the source that is converted, set by the worker process
+        tokenizer: str
+            Also write each TXT file as a binary shard of tokens, using `bytes` or a `module:function` tokenizer
+        read_queue: int
+            The number of blocks read ahead of the parser on a background thread, 0 reads on the main thread
+        read_block: int
+            The size in bytes of each block read from the source
+        write_queue: int
+            The number of blocks waiting to be written by a background thread, 0 writes on the main thread
+        write_block: int
+            The size in bytes of each block handed to the background writer
         """
         self._source = source
         self._dest = dest
         self._lines = lines
         self._dest_pattern = dest_pattern
         self._log = log
+        self._workers = workers
+        self._shards = shards
+        self._index = index
+        self._checkpoint = checkpoint
+        self._resume = resume
+        self._manifest = manifest
+        self._previous = previous
+        self._bytes = bytes
+        self._partitions = partitions
+        self._log_bytes = log_bytes
+        self._log_compress = log_compress
+        self._stats = stats
+        self._profile = profile
+        self._metadata = metadata
+        self._history = history
+        self._ids_file = ids_file
+        self._title_regex = title_regex
+        self._namespaces = namespaces
+        self._sample_rate = sample_rate
+        self._seed = seed
+        self._limit = limit
+        self._quiet = quiet
+        self._progress = progress
+        self._span = span
+        self._tokenizer = tokenizer
+        self._read_queue = read_queue
+        self._read_block = read_block
+        self._write_queue = write_queue
+        self._write_block = write_block
 
     @property
     def source(self) -> pathlib.Path:
@@ -40,6 +129,93 @@ class Convert:
     @property
     def log(self) -> pathlib.Path:
         return self._log
+    @property
+    def workers(self) -> int:
+        return self._workers
+    @property
+    def shards(self) -> int:
+        return self._shards
+    @property
+    def index(self) -> pathlib.Path | None:
+        return self._index
+    @property
+    def checkpoint(self) -> int:
+        return self._checkpoint
+    @property
+    def resume(self) -> bool:
+        return self._resume
+    @property
+    def manifest(self) -> bool:
+        return self._manifest
+    @property
+    def previous(self) -> pathlib.Path | None:
+        return self._previous
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+    @property
+    def partitions(self) -> int:
+        return self._partitions
+    @property
+    def log_bytes(self) -> int:
+        return self._log_bytes
+    @property
+    def log_compress(self) -> bool:
+        return self._log_compress
+    @property
+    def stats(self) -> pathlib.Path | None:
+        return self._stats
+    @property
+    def profile(self) -> bool:
+        return self._profile
+    @property
+    def metadata(self) -> pathlib.Path | None:
+        return self._metadata
+    @property
+    def history(self) -> bool:
+        return self._history
+    @property
+    def ids_file(self) -> pathlib.Path | None:
+        return self._ids_file
+    @property
+    def title_regex(self) -> str | None:
+        return self._title_regex
+    @property
+    def namespaces(self) -> t.List[int] | None:
+        return self._namespaces
+    @property
+    def sample_rate(self) -> float:
+        return self._sample_rate
+    @property
+    def seed(self) -> int:
+        return self._seed
+    @property
+    def limit(self) -> int:
+        return self._limit
+    @property
+    def quiet(self) -> bool:
+        return self._quiet
+    @property
+    def progress(self) -> float:
+        return self._progress
+    @property
+    def span(self) -> t.Tuple[int, int] | None:
+        return self._span
+    @property
+    def tokenizer(self) -> str | None:
+        return self._tokenizer
+    @property
+    def read_queue(self) -> int:
+        return self._read_queue
+    @property
+    def read_block(self) -> int:
+        return self._read_block
+    @property
+    def write_queue(self) -> int:
+        return self._write_queue
+    @property
+    def write_block(self) -> int:
+        return self._write_block
 
     def validate(self) -> None:
         """
@@ -61,5 +237,55 @@ class Convert:
         _file(self._source)
         _folder(self._dest)
         _nonzero_int(self._lines)
+        _nonzero_int(self._workers)
+        _nonzero_int(self._shards)
+        _nonzero_int(self._partitions)
+        if self._bytes < 0:
+            raise ValueError(f'{self._bytes} must be >= 0')
+        if self._checkpoint < 0:
+            raise ValueError(f'{self._checkpoint} must be >= 0')
+        if self._previous is not None:
+            _file(self._previous)
+            if self._previous.parent.resolve() == self._dest.resolve():
+                raise ValueError(f'{str(self._previous)} can not be inside {str(self._dest)}')
+        if self._index is not None:
+            _file(self._index)
+        elif self._shards > 1 and self._source.suffix.lower() == '.bz2':
+            raise ValueError(f'{str(self._source)} needs an index to be split into shards')
+        if self._stats is not None:
+            _folder(self._stats.parent)
+        elif self._profile:
+            raise ValueError('profile needs stats to be given')
+        if self._metadata is not None:
+            _folder(self._metadata.parent)
+        if self._ids_file is not None:
+            _file(self._ids_file)
+        if self._title_regex is not None:
+            try:
+                re.compile(self._title_regex)
+            except re.error as error:
+                raise ValueError(f'{self._title_regex} is not a regular expression: {error}')
+        if self._namespaces is not None and len(self._namespaces) == 0:
+            raise ValueError('namespaces can not be empty')
+        if self._sample_rate <= 0 or self._sample_rate > 1:
+            raise ValueError(f'{self._sample_rate} must be > 0 and <= 1')
+        if self._limit < 0:
+            raise ValueError(f'{self._limit} must be >= 0')
+        if self._progress < 0:
+            raise ValueError(f'{self._progress} must be >= 0')
+        if self._span is not None:
+            if self._span[0] >= self._span[1]:
+                raise ValueError(f'{self._span} is not a byte range')
+            if self._shards > 1:
+                raise ValueError('a byte range can not be split into shards')
+        if self._tokenizer is not None and self._tokenizer != 'bytes' and ':' not in self._tokenizer:
+            raise ValueError(f'{self._tokenizer} is not a tokenizer, use bytes or module:function')
         if self._log is not None:
             _folder(self._log)
+        _nonzero_int(self._log_bytes)
+        if self._read_queue < 0:
+            raise ValueError(f'{self._read_queue} must be >= 0')
+        _nonzero_int(self._read_block)
+        if self._write_queue < 0:
+            raise ValueError(f'{self._write_queue} must be >= 0')
+        _nonzero_int(self._write_block)
@@ -0,0 +1,59 @@
+import pathlib
+
+class Lookup:
+
+    def __init__(self, source: pathlib.Path, id: int | None = None, title: str | None = None, metadata: pathlib.Path | None = None):
+        """
+        Settings for lookup process
+
+        Parameters
+        ----------
+        source : pathlib.Path
+            The folder of a convert run
+        id : int
+            The page id of the article
+        title : str
+            The title of the article, used when there is no `id`
+        metadata : pathlib.Path
+            The CSV file from the metadata process, needed to look up a title
+        """
+        self._source = source
+        self._id = id
+        self._title = title
+        self._metadata = metadata
+
+    @property
+    def source(self) -> pathlib.Path:
+        return self._source
+    @property
+    def id(self) -> int | None:
+        return self._id
+    @property
+    def title(self) -> str | None:
+        return self._title
+    @property
+    def metadata(self) -> pathlib.Path | None:
+        return self._metadata
+
+    def validate(self) -> None:
+        """
+        Ensures the settings have face validity
+        """
+        def _folder(path: pathlib.Path) -> None:
+            if not path.exists():
+                raise ValueError(f'{str(path)} is does not exist')
+            if not path.is_dir():
+                raise ValueError(f'{str(path)} is not a folder')
+        def _file(path: pathlib.Path) -> None:
+            if not path.exists():
+                raise ValueError(f'{str(path)} is does not exist')
+            if not path.is_file():
+                raise ValueError(f'{str(path)} is not a file')
+        _folder(self._source)
+        _file(self._source.joinpath('wikimedia.index.bin'))
+        if (self._id is None) == (self._title is None):
+            raise ValueError('give either the id or the title')
+        if self._title is not None:
+            if self._metadata is None:
+                raise ValueError('looking up a title needs the metadata CSV')
+            _file(self._metadata)
@@ -0,0 +1,48 @@
+import pathlib
+
+class Merge:
+
+    def __init__(self, queue: pathlib.Path, dest: pathlib.Path, log: pathlib.Path | None = None):
+        """
+        Settings for merge process
+
+        Parameters
+        ----------
+        queue : pathlib.Path
+            The folder of tasks written by the plan process, with every task done
+        dest : pathlib.Path
+            The folder for the converted TXT files
+        log: pathlib.Path
+            The folder the workers logged to, the log of each task is combined into it
+        """
+        self._queue = queue
+        self._dest = dest
+        self._log = log
+
+    @property
+    def queue(self) -> pathlib.Path:
+        return self._queue
+    @property
+    def dest(self) -> pathlib.Path:
+        return self._dest
+    @property
+    def log(self) -> pathlib.Path | None:
+        return self._log
+
+    def validate(self) -> None:
+        """
+        Ensures the settings have face validity
+        """
+        def _folder(path: pathlib.Path) -> None:
+            if not path.exists():
+                raise ValueError(f'{str(path)} is does not exist')
+            if not path.is_dir():
+                raise ValueError(f'{str(path)} is not a folder')
+        _folder(self._queue)
+        if not self._queue.joinpath('wikimedia.plan.json').exists():
+            raise ValueError(f'{str(self._queue)} has no plan')
+        _folder(self._dest.parent)
+        if self._dest.resolve() == self._queue.resolve():
+            raise ValueError(f'{str(self._dest)} can not be the queue')
+        if self._log is not None:
+            _folder(self._log)
@@ -0,0 +1,168 @@
+import pathlib
+import re
+import typing as t
+
+class Plan:
+
+    def __init__(self, source: pathlib.Path, queue: pathlib.Path, tasks: int, lines: int, dest_pattern: str, index: pathlib.Path | None = None, checkpoint: int = 10000, manifest: bool = False, previous: pathlib.Path | None = None, bytes: int = 0, partitions: int = 1, metadata: pathlib.Path | None = None, history: bool = False, ids_file: pathlib.Path | None = None, title_regex: str | None = None, namespaces: t.List[int] | None = None, sample_rate: float = 1.0, seed: int = 0):
+        """
+        Settings for plan process
+
+        Parameters
+        ----------
+        source : pathlib.Path
+            The .xml or multistream .xml.bz2 file sourced from Wikimedia, on a filesystem every worker can read
+        queue : pathlib.Path
+            The folder on a shared filesystem the tasks are written to
+        tasks: int
+            The number of byte ranges the source is split into, one per task
+        lines: int
+            The number of lines per TXT file
+        dest_pattern: str
+            The format of the TXT file name
+        index: pathlib.Path
+            The multistream index file that goes with a .xml.bz2 source
+        checkpoint: int
+            The number of articles between the checkpoints of each task, 0 turns them off
+        manifest: bool
+            Write the id, revision, sha1 and location of each article to a manifest
+        previous: pathlib.Path
+            The manifest of an earlier run to copy unchanged articles from
+        bytes: int
+            The target size of each TXT file in bytes, 0 turns it off
+        partitions: int
+            The number of partitions the articles are split into by page id
+        metadata: pathlib.Path
+            The CSV file `merge` writes the metadata to
+        history: bool
+            Only decode the text of the revision that is kept, for full history dumps
+        ids_file: pathlib.Path
+            A file with one page id per line, only those pages are kept
+        title_regex: str
+            Only keep the pages with a title that matches the regular expression
+        namespaces: List[int]
+            The namespaces the pages are kept from, instead of 0
+        sample_rate: float
+            The share of the pages kept, picked by a hash of `seed` and the page id
+        seed: int
+            The seed of the sample
+        """
+        self._source = source
+        self._queue = queue
+        self._tasks = tasks
+        self._lines = lines
+        self._dest_pattern = dest_pattern
+        self._index = index
+        self._checkpoint = checkpoint
+        self._manifest = manifest
+        self._previous = previous
+        self._bytes = bytes
+        self._partitions = partitions
+        self._metadata = metadata
+        self._history = history
+        self._ids_file = ids_file
+        self._title_regex = title_regex
+        self._namespaces = namespaces
+        self._sample_rate = sample_rate
+        self._seed = seed
+
+    @property
+    def source(self) -> pathlib.Path:
+        return self._source
+    @property
+    def queue(self) -> pathlib.Path:
+        return self._queue
+    @property
+    def tasks(self) -> int:
+        return self._tasks
+    @property
+    def lines(self) -> int:
+        return self._lines
+    @property
+    def dest_pattern(self) -> str:
+        return self._dest_pattern
+    @property
+    def index(self) -> pathlib.Path | None:
+        return self._index
+    @property
+    def checkpoint(self) -> int:
+        return self._checkpoint
+    @property
+    def manifest(self) -> bool:
+        return self._manifest
+    @property
+    def previous(self) -> pathlib.Path | None:
+        return self._previous
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+    @property
+    def partitions(self) -> int:
+        return self._partitions
+    @property
+    def metadata(self) -> pathlib.Path | None:
+        return self._metadata
+    @property
+    def history(self) -> bool:
+        return self._history
+    @property
+    def ids_file(self) -> pathlib.Path | None:
+        return self._ids_file
+    @property
+    def title_regex(self) -> str | None:
+        return self._title_regex
+    @property
+    def namespaces(self) -> t.List[int] | None:
+        return self._namespaces
+    @property
+    def sample_rate(self) -> float:
+        return self._sample_rate
+    @property
+    def seed(self) -> int:
+        return self._seed
+
+    def validate(self) -> None:
+        """
+        Ensures the settings have face validity
+        """
+        def _file(path: pathlib.Path) -> None:
+            if not path.exists():
+                raise ValueError(f'{str(path)} is does not exist')
+            if not path.is_file():
+                raise ValueError(f'{str(path)} is not a file')
+        def _folder(path: pathlib.Path) -> None:
+            if not path.exists():
+                raise ValueError(f'{str(path)} is does not exist')
+            if not path.is_dir():
+                raise ValueError(f'{str(path)} is not a folder')
+        def _nonzero_int(val: int):
+            if val <= 0:
+                raise ValueError(f'{val} must be > 0')
+        _file(self._source)
+        _folder(self._queue.parent)
+        _nonzero_int(self._tasks)
+        _nonzero_int(self._lines)
+        _nonzero_int(self._partitions)
+        if self._bytes < 0:
+            raise ValueError(f'{self._bytes} must be >= 0')
+        if self._checkpoint < 0:
+            raise ValueError(f'{self._checkpoint} must be >= 0')
+        if self._previous is not None:
+            _file(self._previous)
+        if self._index is not None:
+            _file(self._index)
+        elif self._source.suffix.lower() == '.bz2':
+            raise ValueError(f'{str(self._source)} needs an index to be split into tasks')
+        if self._metadata is not None:
+            _folder(self._metadata.parent)
+        if self._ids_file is not None:
+            _file(self._ids_file)
+        if self._title_regex is not None:
+            try:
+                re.compile(self._title_regex)
+            except re.error as error:
+                raise ValueError(f'{self._title_regex} is not a regular expression: {error}')
+        if self._namespaces is not None and len(self._namespaces) == 0:
+            raise ValueError('namespaces can not be empty')
+        if self._sample_rate <= 0 or self._sample_rate > 1:
+            raise ValueError(f'{self._sample_rate} must be > 0 and <= 1')
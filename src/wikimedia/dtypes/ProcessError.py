@@ -20,6 +20,10 @@ class ProcessError(ValueError):
         self._issues = issues
         super().__init__(self._issues)
 
+    def __reduce__(self):
+        # Rebuilds with both arguments so the error can cross a process boundary
+        return (ProcessError, (self._document, self._issues))
+
     @property
     def document(self) -> mwxml.iteration.Revision:
         return self._document
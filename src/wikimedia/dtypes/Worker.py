@@ -0,0 +1,129 @@
+import pathlib
+from ..utils.queue_helper import lease_interval
+
+class Worker:
+
+    def __init__(self, queue: pathlib.Path, name: str, steal_after: float = 0, workers: int = 1, log: pathlib.Path | None = None, log_bytes: int = 100000000, log_compress: bool = False, profile: bool = False, quiet: bool = False, progress: float = 0, read_queue: int = 4, read_block: int = 1048576, write_queue: int = 4, write_block: int = 1048576):
+        """
+        Settings for worker process
+
+        Parameters
+        ----------
+        queue : pathlib.Path
+            The folder of tasks written by the plan process
+        name: str
+            The name the tasks are claimed under, unique to this worker
+        steal_after: float
+            The seconds after which the task of a worker that stopped touching its claim is taken over, 0 never takes one over
+        workers: int
+            The number of processes used to extract the articles
+        log: pathlib.Path
+            The folder for the log of revisions that did not process
+        log_bytes: int
+            The size in bytes the error log is started over in a new file at
+        log_compress: bool
+            Compress the error log with gzip
+        profile: bool
+            Sample the hot paths and add them to the stats file of each task
+        quiet: bool
+            Print a plain progress line now and then instead of a progress bar, for logs
+        progress: float
+            The seconds between progress updates, 0 uses 1 for the bar and 60 when quiet
+        read_queue: int
+            The number of blocks read ahead of the parser on a background thread, 0 reads on the main thread
+        read_block: int
+            The size in bytes of each block read from the source
+        write_queue: int
+            The number of blocks waiting to be written by a background thread, 0 writes on the main thread
+        write_block: int
+            The size in bytes of each block handed to the background writer
+        """
+        self._queue = queue
+        self._name = name
+        self._steal_after = steal_after
+        self._workers = workers
+        self._log = log
+        self._log_bytes = log_bytes
+        self._log_compress = log_compress
+        self._profile = profile
+        self._quiet = quiet
+        self._progress = progress
+        self._read_queue = read_queue
+        self._read_block = read_block
+        self._write_queue = write_queue
+        self._write_block = write_block
+
+    @property
+    def queue(self) -> pathlib.Path:
+        return self._queue
+    @property
+    def name(self) -> str:
+        return self._name
+    @property
+    def steal_after(self) -> float:
+        return self._steal_after
+    @property
+    def workers(self) -> int:
+        return self._workers
+    @property
+    def log(self) -> pathlib.Path | None:
+        return self._log
+    @property
+    def log_bytes(self) -> int:
+        return self._log_bytes
+    @property
+    def log_compress(self) -> bool:
+        return self._log_compress
+    @property
+    def profile(self) -> bool:
+        return self._profile
+    @property
+    def quiet(self) -> bool:
+        return self._quiet
+    @property
+    def progress(self) -> float:
+        return self._progress
+    @property
+    def read_queue(self) -> int:
+        return self._read_queue
+    @property
+    def read_block(self) -> int:
+        return self._read_block
+    @property
+    def write_queue(self) -> int:
+        return self._write_queue
+    @property
+    def write_block(self) -> int:
+        return self._write_block
+
+    def validate(self) -> None:
+        """
+        Ensures the settings have face validity
+        """
+        def _folder(path: pathlib.Path) -> None:
+            if not path.exists():
+                raise ValueError(f'{str(path)} is does not exist')
+            if not path.is_dir():
+                raise ValueError(f'{str(path)} is not a folder')
+        def _nonzero_int(val: int):
+            if val <= 0:
+                raise ValueError(f'{val} must be > 0')
+        _folder(self._queue)
+        if not self._queue.joinpath('wikimedia.plan.json').exists():
+            raise ValueError(f'{str(self._queue)} has no plan')
+        if self._name == '' or '/' in self._name or '\\' in self._name:
+            raise ValueError(f'{self._name} can not be used as a file name')
+        if self._steal_after != 0 and self._steal_after <= 2 * lease_interval:
+            raise ValueError(f'{self._steal_after} must be 0 or > {2 * lease_interval}')
+        _nonzero_int(self._workers)
+        if self._log is not None:
+            _folder(self._log)
+        _nonzero_int(self._log_bytes)
+        if self._progress < 0:
+            raise ValueError(f'{self._progress} must be >= 0')
+        if self._read_queue < 0:
+            raise ValueError(f'{self._read_queue} must be >= 0')
+        _nonzero_int(self._read_block)
+        if self._write_queue < 0:
+            raise ValueError(f'{self._write_queue} must be >= 0')
+        _nonzero_int(self._write_block)
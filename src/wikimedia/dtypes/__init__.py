@@ -1,5 +1,11 @@
+from .Article import Article as Article
+from .Benchmark import Benchmark as Benchmark
+from .Checkpoint import Checkpoint as Checkpoint
 from .Convert import Convert as Convert
+from .Lookup import Lookup as Lookup
+from .Merge import Merge as Merge
 from .Metadata import Metadata as Metadata
+from .Plan import Plan as Plan
 from .ProcessError import ProcessError as ProcessError
-from .types import Article as Article
 from .types import Extractor as Extractor
+from .Worker import Worker as Worker
@@ -0,0 +1,197 @@
+import json
+import pathlib
+import platform
+import tempfile
+import time
+import tracemalloc
+import typing as t
+from ..dtypes import Article, ProcessError
+from ..dtypes import Benchmark as settings
+from ..dtypes import Convert as settings_conv, Metadata as settings_meta
+from .. import utils, __version__
+from .Convert import Convert
+from .Metadata import Metadata
+
+Result = t.Dict[str, float | int]
+
+class Benchmark:
+
+    def __init__(self, settings: settings):
+        """
+        Measures the throughput of each stage on a synthetic dump.
+
+        Parameters
+        ----------
+        settings : dtypes.settings.benchmark
+            The settings for the process
+        """
+        self._settings = settings
+
+    def init(self) -> None:
+        self._settings.validate()
+        if self._settings.dest.exists():
+            self._settings.dest.unlink()
+
+    def run(self) -> None:
+        with tempfile.TemporaryDirectory() as work:
+            source = pathlib.Path(work).joinpath('synthetic.xml')
+            utils.write_synthetic_dump(source, self._settings.pages, self._settings.revisions, self._settings.markup, self._settings.seed)
+            size = source.stat().st_size
+            stages: t.Dict[str, Result] = {}
+            for name, stage in self._stages(source, pathlib.Path(work)):
+                stages[name] = self._measure(stage, size)
+                print(f"{name}: {stages[name]['items_per_second']:.1f} items/s {stages[name]['mb_per_second']:.2f} MB/s")
+            history = self._history(pathlib.Path(work).joinpath('history.xml'))
+            print(f"history: {history['peak_bytes'] / 1000000:.2f} MB peak for {history['revisions']} revisions, the limit is {history['limit_bytes'] / 1000000:.2f} MB")
+        results = {
+            'version': __version__,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'settings': {
+                'pages': self._settings.pages,
+                'revisions': self._settings.revisions,
+                'markup': self._settings.markup,
+                'seed': self._settings.seed,
+                'repeat': self._settings.repeat,
+                'history': self._settings.history
+            },
+            'source_bytes': size,
+            'stages': stages,
+            'history': history
+        }
+        with open(self._settings.dest, 'w', encoding = 'utf-8') as fp:
+            json.dump(results, fp, indent = 2)
+
+    def _stages(self, source: pathlib.Path, work: pathlib.Path) -> t.Iterator[t.Tuple[str, t.Callable[[], int]]]:
+        """
+        Each stage returns the number of items it processed
+        The inputs of the micro benchmarks are made up front so only the stage itself is timed.
+        """
+        fields = Convert._field_selection()
+        revisions = list(utils.list_revisions(source))
+        articles = list(utils.extract_articles(iter(revisions), fields, Benchmark._ignore))
+        paragraphs = [paragraph for article in articles for paragraph in t.cast(t.List[str], article['text'])]
+        yield 'list_revisions', lambda: _count(utils.list_revisions(source))
+        yield 'scan_revisions', lambda: _count(utils.scan_revisions(source))
+        yield 'extract_text', lambda: _count(map(utils.extract_text, revisions))
+        yield 'extract_articles', lambda: _count(utils.extract_articles(iter(revisions), fields, Benchmark._ignore))
+        yield 'split_sentences', lambda: Benchmark._split(paragraphs)
+        yield 'flatten_article', lambda: Benchmark._flatten(articles)
+        yield 'write_txt', lambda: Benchmark._write_txt(work.joinpath('txt'), articles)
+        yield 'write_csv', lambda: _count(Metadata._stream_csv(work.joinpath('metadata.csv'), ['id', 'title'], iter(articles)))
+        yield 'convert', lambda: Benchmark._convert(source, work.joinpath('convert'), len(articles))
+        yield 'lookup_article', lambda: Benchmark._lookup(work.joinpath('convert'), [t.cast(int, article['id']) for article in articles])
+        yield 'write_tokens', lambda: Benchmark._tokens(work.joinpath('convert'), len(articles))
+        yield 'metadata', lambda: Benchmark._metadata(source, work.joinpath('metadata.csv'), len(revisions))
+        yield 'convert_metadata', lambda: Benchmark._convert(source, work.joinpath('convert'), len(articles), work.joinpath('metadata.csv'))
+        yield 'convert_sample', lambda: Benchmark._sample(source, work.joinpath('convert'), len(revisions))
+
+    def _measure(self, stage: t.Callable[[], int], size: int) -> Result:
+        best: float | None = None
+        items = 0
+        for _ in range(self._settings.repeat):
+            start = time.perf_counter()
+            items = stage()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        seconds = t.cast(float, best)
+        return {
+            'seconds': seconds,
+            'items': items,
+            'items_per_second': items / seconds if seconds > 0 else 0.0,
+            'mb_per_second': size / seconds / 1000000 if seconds > 0 else 0.0
+        }
+
+    def _history(self, source: pathlib.Path) -> t.Dict[str, float | int | bool]:
+        """
+        Reads a page with a very long history and checks the peak memory does not grow with it
+        The limit is a few read blocks plus a few copies of the largest revision, no matter how many revisions there are.
+        """
+        largest = utils.write_synthetic_history(source, self._settings.history, self._settings.markup, self._settings.seed)
+        start = time.perf_counter()
+        tracemalloc.start()
+        try:
+            items = _count(utils.scan_revisions(source, text = True))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        seconds = time.perf_counter() - start
+        limit = 5 * utils.fs_helper._block_size + 4 * largest
+        return {
+            'revisions': self._settings.history,
+            'items': items,
+            'source_bytes': source.stat().st_size,
+            'largest_revision_bytes': largest,
+            'seconds': seconds,
+            'peak_bytes': peak,
+            'limit_bytes': limit,
+            'bounded': peak <= limit
+        }
+
+    @staticmethod
+    def _split(paragraphs: t.List[str]) -> int:
+        for paragraph in paragraphs:
+            for _ in Convert._split_sentences(paragraph):
+                pass
+        return len(paragraphs)
+
+    @staticmethod
+    def _flatten(articles: t.List[Article]) -> int:
+        for article in articles:
+            for _ in Convert._flatten_article(article):
+                pass
+        return len(articles)
+
+    @staticmethod
+    def _write_txt(dest: pathlib.Path, articles: t.List[Article]) -> int:
+        dest.mkdir(exist_ok = True)
+        Convert._flatten_and_save(lambda i: dest.joinpath(f'wikimedia.{i:04}.txt'), 1000000, iter(articles))
+        return len(articles)
+
+    @staticmethod
+    def _convert(source: pathlib.Path, dest: pathlib.Path, pages: int, metadata: pathlib.Path | None = None) -> int:
+        dest.mkdir(exist_ok = True)
+        app = Convert(settings_conv(source, dest, 1000000, 'wikimedia.{id:04}.txt', None, metadata = metadata))
+        app.init()
+        app.run()
+        return pages
+
+    @staticmethod
+    def _sample(source: pathlib.Path, dest: pathlib.Path, pages: int) -> int:
+        """
+        A 1% sample read with the byte scanner, counted in pages read
+        """
+        dest.mkdir(exist_ok = True)
+        app = Convert(settings_conv(source, dest, 1000000, 'wikimedia.{id:04}.txt', None, history = True, sample_rate = 0.01))
+        app.init()
+        app.run()
+        return pages
+
+    @staticmethod
+    def _lookup(dest: pathlib.Path, pages: t.List[int]) -> int:
+        with utils.ArticleIndex(dest) as index:
+            for page in pages:
+                index.get(page)
+        return len(pages)
+
+    @staticmethod
+    def _tokens(dest: pathlib.Path, pages: int) -> int:
+        utils.write_token_shards(dest, 'bytes')
+        return pages
+
+    @staticmethod
+    def _metadata(source: pathlib.Path, dest: pathlib.Path, pages: int) -> int:
+        app = Metadata(settings_meta(source, dest, None))
+        app.init()
+        app.run()
+        return pages
+
+    @staticmethod
+    def _ignore(error: ProcessError) -> None:
+        pass
+
+def _count(items: t.Iterable[t.Any]) -> int:
+    n = 0
+    for _ in items:
+        n += 1
+    return n
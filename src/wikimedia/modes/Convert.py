@@ -1,14 +1,26 @@
+import functools
+import itertools
+import os
 import pathlib
+import re
 import shutil
+import time
 import typing as t
-from ..dtypes import Article, Extractor, ProcessError
+from ..dtypes import Article, Checkpoint, Extractor, ProcessError
 from ..dtypes import Convert as settings
 from .. import utils
-from io import TextIOWrapper
+from .Metadata import Metadata
+
+T = t.TypeVar('T')
 
 class Convert:
 
     _eos = "!?."
+    _boundary = re.compile(f'[{re.escape(_eos)}] ')
+    _buffer_size = 1 << 20
+    _checkpoint_name = 'wikimedia.checkpoint.json'
+    _manifest_name = 'wikimedia.manifest.csv'
+    _files_name = 'wikimedia.files.csv'
 
     def __init__(self, settings: settings):
         """
@@ -20,25 +32,138 @@ class Convert:
             The settings for the process
         """
         self._settings = settings
+        self._errors: utils.ErrorLog | None = None
+        self._manifest: utils.ManifestWriter | None = None
+        self._index: utils.IndexWriter | None = None
+        self._metadata: utils.CsvWriter | None = None
+        self._writer: utils.WriteBehind | None = None
 
     def init(self) -> None:
         self._settings.validate()
+        if self._settings.resume and self._checkpoint_path().exists():
+            return
         if self._settings.dest.exists():
             shutil.rmtree(self._settings.dest)
         self._settings.dest.mkdir(parents = True, exist_ok = True)
 
     def run(self) -> None:
-        fields = Convert._field_selection()
-        revisions = utils.list_revisions(self._settings.source)
-        revisions = utils.progress_overlay(revisions, 'Reading article #')
-        articles = utils.extract_articles(revisions, fields, self._log_bad_extract)
-        Convert._flatten_and_save(self._file_name, self._settings.lines, articles)
+        with utils.StatsReport(self._settings.stats, self._settings.profile, io = self._io()):
+            if self._settings.log is None:
+                self._run()
+            else:
+                with utils.ErrorLog(self._settings.log, self._settings.log_bytes, self._settings.log_compress) as self._errors:
+                    self._run()
+                self._errors = None
+
+    def _run(self) -> None:
+        if self._settings.write_queue > 0:
+            self._writer = utils.WriteBehind(self._settings.write_queue, self._settings.write_block)
+        try:
+            self._convert()
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def _convert(self) -> None:
+        previous = None if self._settings.previous is None else utils.PreviousRun(self._settings.previous)
+        fields = Convert._field_selection(self._settings.manifest, previous)
+        resume = Checkpoint.load(self._checkpoint_path()) if self._settings.resume and self._checkpoint_path().exists() else None
+        if resume is not None and len(resume.files) != self._settings.partitions:
+            raise ValueError(f'the checkpoint has {len(resume.files)} partitions, not {self._settings.partitions}')
+        if self._settings.metadata is not None:
+            metadata = Metadata._field_selection()
+            for name, extractor in metadata.items():
+                fields.setdefault(name, extractor)
+            self._metadata = utils.CsvWriter(self._settings.metadata, list(metadata.keys()), None if resume is None else resume.metadata, self._writer)
+        articles = self._list_articles(fields, resume)
+        if self._settings.limit > 0:
+            saved = 0 if resume is None else sum(stats[2] for stats in resume.stats.values())
+            articles = itertools.islice(articles, max(self._settings.limit - saved, 0))
+        if self._metadata is not None:
+            articles = Metadata._write_csv(self._metadata, articles)
+        save = self._save_checkpoint if self._settings.checkpoint > 0 else None
+        if self._settings.manifest:
+            self._manifest = utils.ManifestWriter(self._settings.dest.joinpath(Convert._manifest_name), None if resume is None else resume.manifest)
+        self._index = utils.IndexWriter(self._settings.dest.joinpath(utils.index_name), None if resume is None else resume.index)
+        finished = False
+        try:
+            files = Convert._flatten_and_save(self._file_name, self._settings.lines, articles, save, self._settings.checkpoint, resume, self._locate_article, self._settings.bytes, self._settings.partitions, self._writer)
+            finished = True
+        finally:
+            if self._manifest is not None:
+                self._manifest.close()
+                self._manifest = None
+            if self._metadata is not None:
+                self._metadata.close()
+                self._metadata = None
+            self._index.close(self._settings.dest_pattern if finished else None)
+            self._index = None
+        utils.write_files(self._settings.dest.joinpath(Convert._files_name), {self._file_name(k).name: v for k, v in sorted(files.items())})
+        if self._settings.metadata is not None:
+            utils.write_titles(self._settings.metadata, self._settings.dest.joinpath(utils.titles_name))
+        if self._settings.tokenizer is not None:
+            utils.write_token_shards(self._settings.dest, self._settings.tokenizer, self._settings.workers)
+        if self._checkpoint_path().exists():
+            self._checkpoint_path().unlink()
+
+    def _list_articles(self, fields: t.Dict[str, Extractor], resume: Checkpoint | None) -> t.Iterator[Article]:
+        """
+        A resume starts reading at the page of the checkpoint, which is searched for back from how far the source had been read
+        """
+        after = None if resume is None else resume.page
+        start = None if resume is None else utils.find_page(self._settings.source, resume.page, resume.source, self._settings.index)
+        page_filter = self._page_filter()
+        if self._settings.history or page_filter is not None:
+            reader = functools.partial(utils.scan_revisions, text = True, page_filter = page_filter, read_queue = self._settings.read_queue, read_block = self._settings.read_block)
+        else:
+            reader = functools.partial(utils.list_revisions, page_filter = page_filter, read_queue = self._settings.read_queue, read_block = self._settings.read_block)
+        if self._settings.shards > 1:
+            articles = utils.extract_shards(self._settings.source, self._settings.shards, fields, self._log_bad_extract, self._settings.workers, self._settings.index, reader, after, start)
+            return self._progress(articles)
+        span = self._settings.span
+        if start is not None:
+            spans = [(start, span[1])] if span is not None else utils.split_source(self._settings.source, 1, self._settings.index, after, start = start)
+            span = spans[0] if len(spans) > 0 else span
+        revisions = reader(self._settings.source, span, self._settings.index, self._settings.workers, after)
+        revisions = self._progress(revisions)
+        return utils.extract_articles(revisions, fields, self._log_bad_extract, self._settings.workers)
+
+    def _progress(self, items: t.Iterator[T]) -> t.Iterator[T]:
+        return utils.progress_overlay(items, 'Reading articles', self._settings.source, self._settings.quiet, None if self._settings.progress == 0 else self._settings.progress)
+
+    def _io(self) -> t.Dict[str, int]:
+        settings = self._settings
+        return {'read_queue': settings.read_queue, 'read_block': settings.read_block, 'write_queue': settings.write_queue, 'write_block': settings.write_block}
+
+    def _page_filter(self) -> utils.PageFilter | None:
+        settings = self._settings
+        if settings.ids_file is None and settings.title_regex is None and settings.namespaces is None and settings.sample_rate >= 1:
+            return None
+        return utils.PageFilter(settings.ids_file, settings.title_regex, settings.namespaces, settings.sample_rate, settings.seed)
 
     def _log_bad_extract(self, error: ProcessError) -> None:
-        if self._settings.log is None:
+        if self._errors is None:
             print(f"Error: {','.join(error.issues)}")
         else:
-            utils.write_log(self._settings.log, error)
+            self._errors.write(error)
+
+    def _checkpoint_path(self) -> pathlib.Path:
+        return self._settings.dest.joinpath(Convert._checkpoint_name)
+
+    def _save_checkpoint(self, checkpoint: Checkpoint) -> None:
+        manifest = 0 if self._manifest is None else self._manifest.sync()
+        index = 0 if self._index is None else self._index.sync()
+        metadata = 0 if self._metadata is None else self._metadata.sync()
+        checkpoint = Checkpoint(checkpoint.page, checkpoint.files, manifest, checkpoint.stats, index, metadata, utils.source_position())
+        checkpoint.save(self._checkpoint_path())
+
+    def _locate_article(self, article: Article, file: int, offset: int, length: int) -> None:
+        page_id = t.cast(int, article['id'])
+        if self._manifest is not None:
+            self._manifest.write(page_id, t.cast(int | None, article.get('revision')), t.cast(str | None, article.get('sha1')), self._file_name(file).name, offset, length)
+        if self._index is not None:
+            self._index.write(page_id, file, offset, length)
 
     def _file_name(self, i: int) -> pathlib.Path:
         file_name = self._settings.dest_pattern.format(id = i)
@@ -46,33 +171,115 @@ class Convert:
         return file_path
 
     @staticmethod
-    def _field_selection() -> t.Dict[str, Extractor]:
+    def _field_selection(manifest: bool = False, previous: utils.PreviousRun | None = None) -> t.Dict[str, Extractor]:
         fields: t.Dict[str, Extractor] = {}
         fields['id'] = utils.extract_id
         fields['title'] = utils.extract_title
-        fields['text'] = utils.extract_text
+        if previous is None:
+            fields['text'] = utils.extract_text
+        else:
+            fields['text'] = functools.partial(utils.extract_text_or_reuse, previous)
+        if manifest:
+            fields['revision'] = utils.extract_revision
+            fields['sha1'] = utils.extract_sha1
         return fields
 
     @staticmethod
-    def _flatten_and_save(file_name: t.Callable[[int], pathlib.Path], count: int, articles: t.Iterator[Article]) -> None:
-        fp: TextIOWrapper | None = None
-        fp_i: int = 0
-        fp_lines: int = 0
+    def _flatten_and_save(file_name: t.Callable[[int], pathlib.Path], count: int, articles: t.Iterator[Article], checkpoint: t.Callable[[Checkpoint], None] | None = None, interval: int = 0, resume: Checkpoint | None = None, locate: t.Callable[[Article, int, int, int], None] | None = None, size: int = 0, partitions: int = 1, writer: utils.WriteBehind | None = None) -> t.Dict[int, t.List[int]]:
+        """
+        The TXT files are written as bytes through a large buffer, or handed to `writer` when given
+        Lines end in `os.linesep`, the same as a file opened in text mode.
+        A file is closed once it has `count` lines or, when `size` is given, `size` bytes.
+        Each article goes to partition `id % partitions`, partition p writes the files p, p + partitions, p + 2 * partitions, ...
+        Returns the bytes, lines, articles, first page id and last page id of each file.
+        """
+        newline = os.linesep
+        separator = newline.encode('utf-8')
+        buffer_size = max(Convert._buffer_size // partitions, 1 << 16)
+        def _open(path: pathlib.Path, mode: str) -> t.BinaryIO:
+            if writer is None:
+                return t.cast(t.BinaryIO, open(path, mode, buffering = buffer_size))
+            return t.cast(t.BinaryIO, writer.open(path, mode))
+        outputs = [_Output(i) for i in range(partitions)]
+        stats: t.Dict[int, t.List[int]] = {}
+        if resume is not None:
+            Convert._rollback(file_name, resume, partitions)
+            stats = {k: list(v) for k, v in resume.stats.items()}
+            for output, (file, file_lines, file_size) in zip(outputs, resume.files):
+                output.file = file
+                if file_size > 0:
+                    output.fp = _open(file_name(file), 'ab')
+                    output.lines = file_lines
+                    output.size = file_size
+        saved: int = 0
         for article in articles:
-            if fp is None:
-                fp = open(file_name(fp_i), 'w', encoding = 'utf-8')
-                fp_i += 1
-                fp_lines = 0
-            lines = [line for line in Convert._flatten_article(article)]
-            fp.writelines((f'{x}\n' for x in lines))
-            fp_lines += len(lines) + 1
-            if fp_lines >= count:
-                fp.close()
-                fp = None
+            page = t.cast(int, article.get('id', 0))
+            output = outputs[page % partitions]
+            if output.fp is None:
+                output.fp = _open(file_name(output.file), 'wb')
+                output.lines = 0
+                output.size = 0
+            start = time.perf_counter()
+            lines = list(Convert._flatten_article(article))
+            data = (newline.join(lines) + newline).encode('utf-8') if len(lines) > 0 else b''
+            flattened = time.perf_counter()
+            output.fp.write(data)
+            if locate is not None:
+                locate(article, output.file, output.size, len(data))
+            output.size += len(data)
+            output.lines += len(lines) + 1
+            file_stats = stats.setdefault(output.file, [0, 0, 0, page, page])
+            file_stats[1] += len(lines)
+            file_stats[2] += 1
+            file_stats[4] = page
+            if output.lines >= count or (size > 0 and output.size >= size):
+                output.fp.close()
+                output.fp = None
+                output.file += partitions
+            else:
+                output.fp.write(separator)
+                output.size += len(separator)
+                file_stats[1] += 1
+            file_stats[0] = output.size
+            utils.record_stage('flatten_article', flattened - start, len(lines))
+            utils.record_stage('write_txt', time.perf_counter() - flattened, 1, len(data))
+            saved += 1
+            if checkpoint is not None and saved >= interval:
+                saved = 0
+                checkpoint(Convert._checkpoint(outputs, page, stats))
+        for output in outputs:
+            if output.fp is not None:
+                output.fp.close()
+        return stats
+
+    @staticmethod
+    def _checkpoint(outputs: t.List['_Output'], page: int, stats: t.Dict[int, t.List[int]]) -> Checkpoint:
+        """
+        Makes sure everything written so far is on disk before it is recorded
+        """
+        files: t.List[t.List[int]] = []
+        for output in outputs:
+            if output.fp is None:
+                files.append([output.file, 0, 0])
             else:
-                fp.writelines(['\n'])
-        if fp is not None:
-            fp.close()
+                output.fp.flush()
+                os.fsync(output.fp.fileno())
+                files.append([output.file, output.lines, output.size])
+        return Checkpoint(page, files, 0, {k: list(v) for k, v in stats.items()})
+
+    @staticmethod
+    def _rollback(file_name: t.Callable[[int], pathlib.Path], resume: Checkpoint, partitions: int) -> None:
+        """
+        Cuts the output back to the last checkpoint, anything written after it is written again
+        """
+        for file, _, file_size in resume.files:
+            i = file
+            while file_name(i).exists():
+                if i == file and file_size > 0:
+                    os.truncate(file_name(i), file_size)
+                else:
+                    file_name(i).unlink()
+                i += partitions
 
     @staticmethod
     def _flatten_article(article: Article) -> t.Iterator[str]:
@@ -89,13 +296,29 @@ class Convert:
 
     @staticmethod
     def _split_sentences(text: str) -> t.Iterator[str]:
-        words = text.split()
+        """
+        A sentence ends at a "!?." that is followed by a word starting with an upper case letter or a digit
+        Only the character after each candidate end is checked.
+        """
+        text = ' '.join(text.split())
         st: int = 0
-        for i in range(0, len(words)-1):
-            if words[i][-1] in Convert._eos:
-                if words[i+1][0].isupper() or words[i+1][0].isdigit():
-                    yield ' '.join(words[st:(i+1)])
-                    st = i + 1
-        if st < len(words):
-            yield ' '.join(words[st:len(text)])
+        for match in Convert._boundary.finditer(text):
+            end = match.end()
+            if text[end].isupper() or text[end].isdigit():
+                yield text[st:(end - 1)]
+                st = end
+        if st < len(text):
+            yield text[st:]
+
+class _Output:
+    """
+    The TXT file a partition is writing to
+    `file` is the `id` of the open file, or of the next file when none is open.
+    """
+    __slots__ = ('file', 'fp', 'lines', 'size')
 
+    def __init__(self, file: int):
+        self.file = file
+        self.fp: t.BinaryIO | None = None
+        self.lines = 0
+        self.size = 0
@@ -0,0 +1,31 @@
+from ..dtypes import Lookup as settings
+from .. import utils
+
+class Lookup:
+
+    def __init__(self, settings: settings):
+        """
+        Prints one article of a convert run.
+
+        Parameters
+        ----------
+        settings : dtypes.settings.lookup
+            The settings for the process
+        """
+        self._settings = settings
+
+    def init(self) -> None:
+        self._settings.validate()
+
+    def run(self) -> None:
+        with utils.ArticleIndex(self._settings.source, self._settings.metadata) as index:
+            if self._settings.id is not None:
+                article = index.get(self._settings.id)
+                key = str(self._settings.id)
+            else:
+                article = index.find(str(self._settings.title))
+                key = str(self._settings.title)
+        if article is None:
+            print(f'Error: {key} was not found')
+        else:
+            print(article, end = '')
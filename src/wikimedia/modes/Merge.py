@@ -0,0 +1,110 @@
+import csv
+import os
+import pathlib
+import shutil
+import typing as t
+from ..dtypes import Merge as settings
+from .. import utils
+from .Convert import Convert
+from .Worker import Worker
+
+class Merge:
+
+    def __init__(self, settings: settings):
+        """
+        Gathers the output of every task of a plan into one convert run.
+
+        Parameters
+        ----------
+        settings : dtypes.settings.merge
+            The settings for the process
+        """
+        self._settings = settings
+
+    def init(self) -> None:
+        self._settings.validate()
+        missing = utils.TaskQueue(self._settings.queue).missing()
+        if len(missing) > 0:
+            raise ValueError(f'{len(missing)} tasks are not done, the first is task {missing[0] + 1}')
+        if self._settings.dest.exists():
+            shutil.rmtree(self._settings.dest)
+        self._settings.dest.mkdir(parents = True, exist_ok = True)
+
+    def run(self) -> None:
+        queue = utils.TaskQueue(self._settings.queue)
+        convert: t.Dict[str, t.Any] = queue.plan['convert']
+        dest = self._settings.dest
+        files: t.Dict[str, t.List[int]] = {}
+        index = utils.IndexWriter(dest.joinpath(utils.index_name))
+        manifest = Merge._open_csv(dest.joinpath(Convert._manifest_name), utils.manifest_fields) if convert['manifest'] else None
+        metadata = None if convert['metadata'] is None else open(convert['metadata'], 'wb')
+        finished = False
+        try:
+            base = 0
+            for task in range(queue.tasks):
+                base = self._merge_task(queue.done_folder(task), base, convert['dest_pattern'], convert['partitions'], files, index, manifest, metadata)
+            finished = True
+        finally:
+            index.close(convert['dest_pattern'] if finished else None)
+            if manifest is not None:
+                manifest[0].close()
+            if metadata is not None:
+                metadata.close()
+        utils.write_files(dest.joinpath(Convert._files_name), files)
+        if convert['metadata'] is not None:
+            utils.write_titles(pathlib.Path(convert['metadata']), dest.joinpath(utils.titles_name))
+        if self._settings.log is not None:
+            utils.combine_logs([self._settings.log.joinpath(queue.work_folder(task).name) for task in range(queue.tasks)], self._settings.log)
+        print(f'{queue.tasks} tasks merged into {len(files)} files')
+
+    def _merge_task(self, folder: pathlib.Path, base: int, dest_pattern: str, partitions: int, files: t.Dict[str, t.List[int]], index: utils.IndexWriter, manifest: t.Tuple[t.TextIO, t.Any] | None, metadata: t.BinaryIO | None) -> int:
+        """
+        Links the TXT files of one task into dest, the file ids are moved up by `base`
+        `base` is a multiple of `partitions`, so every file stays in its partition.
+        The files in `done` are never moved or changed, so a merge that was stopped part way can be run again.
+        Returns the `base` of the next task.
+        """
+        last = -1
+        with utils.ArticleIndex(folder) as task_index:
+            for page_id, file, offset, length in task_index.records():
+                index.write(page_id, base + file, offset, length)
+                last = max(last, file)
+        names = {dest_pattern.format(id = file): dest_pattern.format(id = base + file) for file in range(last + 1)}
+        for old, new in names.items():
+            if folder.joinpath(old).exists():
+                Merge._link(folder.joinpath(old), self._settings.dest.joinpath(new))
+        for row in Merge._read_csv(folder.joinpath(Convert._files_name)):
+            files[names[row['file']]] = [int(row[field]) for field in utils.file_fields[1:]]
+        if manifest is not None:
+            for row in Merge._read_csv(folder.joinpath(Convert._manifest_name)):
+                row['file'] = names[row['file']]
+                manifest[1].writerow([row[field] for field in utils.manifest_fields])
+        if metadata is not None:
+            with open(folder.joinpath(Worker._metadata_name), 'rb') as fp:
+                header = fp.readline()
+                if metadata.tell() == 0:
+                    metadata.write(header)
+                shutil.copyfileobj(fp, metadata)
+        return base + (last + partitions) // partitions * partitions
+
+    @staticmethod
+    def _link(source: pathlib.Path, dest: pathlib.Path) -> None:
+        """
+        Hard links the file so no data is copied, or copies it when `dest` is on another filesystem
+        """
+        try:
+            os.link(source, dest)
+        except OSError:
+            shutil.copyfile(source, dest)
+
+    @staticmethod
+    def _open_csv(path: pathlib.Path, fields: t.List[str]) -> t.Tuple[t.TextIO, t.Any]:
+        fp = open(path, 'w', encoding = 'utf-8', newline = '')
+        writer = csv.writer(fp, delimiter = ',', quotechar = '"', quoting = csv.QUOTE_ALL)
+        writer.writerow(fields)
+        return fp, writer
+
+    @staticmethod
+    def _read_csv(path: pathlib.Path) -> t.Iterator[t.Dict[str, str]]:
+        with open(path, 'r', encoding = 'utf-8', newline = '') as fp:
+            yield from csv.DictReader(fp, delimiter = ',', quotechar = '"')
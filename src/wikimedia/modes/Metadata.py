@@ -1,10 +1,14 @@
-import csv
+import functools
+import itertools
 import pathlib
+import time
 import typing as t
 from ..dtypes import Article, Extractor, ProcessError
 from ..dtypes import Metadata as settings
 from .. import utils
 
+T = t.TypeVar('T')
+
 class Metadata:
 
     def __init__(self, settings: settings):
@@ -17,6 +21,7 @@ class Metadata:
             The settings for the process
         """
         self._settings = settings
+        self._errors: utils.ErrorLog | None = None
 
     def init(self) -> None:
         self._settings.validate()
@@ -24,19 +29,58 @@ class Metadata:
             self._settings.dest.unlink()
 
     def run(self) -> None:
+        with utils.StatsReport(self._settings.stats, self._settings.profile, io = self._io()):
+            if self._settings.log is None:
+                self._run()
+            else:
+                with utils.ErrorLog(self._settings.log, self._settings.log_bytes, self._settings.log_compress) as self._errors:
+                    self._run()
+                self._errors = None
+
+    def _run(self) -> None:
         fields = Metadata._field_selection()
         field_names = [x for x in fields.keys()]
-        revisions = utils.list_revisions(self._settings.source)
-        revisions = utils.progress_overlay(revisions, 'Reading article #')
-        articles = utils.extract_articles(revisions, fields, self._log_bad_extract)
-        articles = Metadata._stream_csv(self._settings.dest, field_names, articles)
-        for _ in articles: pass
+        articles = self._list_articles(fields)
+        if self._settings.limit > 0:
+            articles = itertools.islice(articles, self._settings.limit)
+        writer = utils.WriteBehind(self._settings.write_queue, self._settings.write_block) if self._settings.write_queue > 0 else None
+        try:
+            articles = Metadata._stream_csv(self._settings.dest, field_names, articles, writer)
+            for _ in articles: pass
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def _list_articles(self, fields: t.Dict[str, Extractor]) -> t.Iterator[Article]:
+        """
+        Only the page metadata is needed so the text is never read
+        """
+        reader = functools.partial(utils.scan_revisions, page_filter = self._page_filter(), read_queue = self._settings.read_queue, read_block = self._settings.read_block)
+        if self._settings.shards > 1:
+            articles = utils.extract_shards(self._settings.source, self._settings.shards, fields, self._log_bad_extract, self._settings.workers, self._settings.index, reader)
+            return self._progress(articles)
+        revisions = reader(self._settings.source, None, self._settings.index, self._settings.workers)
+        revisions = self._progress(revisions)
+        return utils.extract_articles(revisions, fields, self._log_bad_extract, self._settings.workers)
+
+    def _progress(self, items: t.Iterator[T]) -> t.Iterator[T]:
+        return utils.progress_overlay(items, 'Reading articles', self._settings.source, self._settings.quiet, None if self._settings.progress == 0 else self._settings.progress)
+
+    def _io(self) -> t.Dict[str, int]:
+        settings = self._settings
+        return {'read_queue': settings.read_queue, 'read_block': settings.read_block, 'write_queue': settings.write_queue, 'write_block': settings.write_block}
+
+    def _page_filter(self) -> utils.PageFilter | None:
+        settings = self._settings
+        if settings.ids_file is None and settings.title_regex is None and settings.namespaces is None and settings.sample_rate >= 1:
+            return None
+        return utils.PageFilter(settings.ids_file, settings.title_regex, settings.namespaces, settings.sample_rate, settings.seed)
 
     def _log_bad_extract(self, error: ProcessError) -> None:
-        if self._settings.log is None:
+        if self._errors is None:
             print(f"Error: {','.join(error.issues)}")
         else:
-            utils.write_log(self._settings.log, error)
+            self._errors.write(error)
 
     @staticmethod
     def _field_selection() -> t.Dict[str, Extractor]:
@@ -46,16 +90,17 @@ class Metadata:
         return fields
 
     @staticmethod
-    def _stream_csv(dest: pathlib.Path, fields: t.List[str], articles: t.Iterator[Article]) -> t.Iterator[Article]:
-        with open(dest, 'w', encoding = 'utf-8', newline = '') as fp:
-            writer = csv.writer(fp, delimiter = ',', quotechar = '"', quoting = csv.QUOTE_ALL)    
-            writer.writerow(fields)
-            for article in articles:
-                row: t.List[str | None] = [None] * len(fields)
-                for i in range(0, len(fields)):
-                    if fields[i] in article:
-                        val = article[fields[i]]
-                        if val is not None:
-                            row[i] = str(val)
-                writer.writerow(row)
-                yield article
+    def _stream_csv(dest: pathlib.Path, fields: t.List[str], articles: t.Iterator[Article], behind: utils.WriteBehind | None = None) -> t.Iterator[Article]:
+        writer = utils.CsvWriter(dest, fields, writer = behind)
+        try:
+            yield from Metadata._write_csv(writer, articles)
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write_csv(writer: utils.CsvWriter, articles: t.Iterator[Article]) -> t.Iterator[Article]:
+        for article in articles:
+            start = time.perf_counter()
+            writer.write(article)
+            utils.record_stage('write_csv', time.perf_counter() - start)
+            yield article
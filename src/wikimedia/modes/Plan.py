@@ -0,0 +1,46 @@
+import typing as t
+from ..dtypes import Plan as settings
+from .. import utils
+
+class Plan:
+
+    def __init__(self, settings: settings):
+        """
+        Splits the corpus into tasks that workers on several machines can convert.
+
+        Parameters
+        ----------
+        settings : dtypes.settings.plan
+            The settings for the process
+        """
+        self._settings = settings
+
+    def init(self) -> None:
+        self._settings.validate()
+
+    def run(self) -> None:
+        settings = self._settings
+        spans = utils.split_source(settings.source, settings.tasks, settings.index)
+        plan: t.Dict[str, t.Any] = {
+            'source': str(settings.source.resolve()),
+            'index': None if settings.index is None else str(settings.index.resolve()),
+            'tasks': [list(span) for span in spans],
+            'convert': {
+                'lines': settings.lines,
+                'dest_pattern': settings.dest_pattern,
+                'checkpoint': settings.checkpoint,
+                'manifest': settings.manifest,
+                'previous': None if settings.previous is None else str(settings.previous.resolve()),
+                'bytes': settings.bytes,
+                'partitions': settings.partitions,
+                'metadata': None if settings.metadata is None else str(settings.metadata.resolve()),
+                'history': settings.history,
+                'ids_file': None if settings.ids_file is None else str(settings.ids_file.resolve()),
+                'title_regex': settings.title_regex,
+                'namespaces': settings.namespaces,
+                'sample_rate': settings.sample_rate,
+                'seed': settings.seed
+            }
+        }
+        queue = utils.TaskQueue.create(settings.queue, plan)
+        print(f'{queue.tasks} tasks written to {str(settings.queue)}')
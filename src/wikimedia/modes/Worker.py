@@ -0,0 +1,95 @@
+import pathlib
+import typing as t
+from ..dtypes import Convert as settings_conv
+from ..dtypes import Worker as settings
+from .. import utils
+from .Convert import Convert
+
+class Worker:
+
+    _metadata_name = 'wikimedia.metadata.csv'
+    _stats_name = 'wikimedia.stats.json'
+
+    def __init__(self, settings: settings):
+        """
+        Converts the tasks of a plan until there are none left.
+
+        Parameters
+        ----------
+        settings : dtypes.settings.worker
+            The settings for the process
+        """
+        self._settings = settings
+
+    def init(self) -> None:
+        self._settings.validate()
+
+    def run(self) -> None:
+        queue = utils.TaskQueue(self._settings.queue)
+        done = 0
+        while True:
+            task = queue.claim(self._settings.name, self._settings.steal_after)
+            if task is None:
+                break
+            print(f'--- task {task + 1} of {queue.tasks} ---')
+            queue.work_folder(task).mkdir(exist_ok = True)
+            if self._settings.log is not None:
+                self._task_log(queue, task).mkdir(exist_ok = True)
+            with queue.lease(task, self._settings.name) as lease:
+                app = Convert(self._task_settings(queue, task))
+                app.init()
+                app.run()
+            if lease.lost:
+                print(f'task {task + 1} was taken over by another worker')
+                continue
+            queue.finish(task, self._settings.name)
+            done += 1
+        print(f'{self._settings.name} converted {done} tasks')
+
+    def _task_log(self, queue: utils.TaskQueue, task: int) -> pathlib.Path:
+        """
+        Each task logs to its own folder, so workers sharing `log` never write to the same file
+        """
+        return t.cast(pathlib.Path, self._settings.log).joinpath(queue.work_folder(task).name)
+
+    def _task_settings(self, queue: utils.TaskQueue, task: int) -> settings_conv:
+        """
+        Converts the byte range of the task into its work folder, resuming from the task's checkpoint when there is one
+        """
+        plan = queue.plan
+        convert: t.Dict[str, t.Any] = plan['convert']
+        dest = queue.work_folder(task)
+        def _path(value: str | None) -> pathlib.Path | None:
+            return None if value is None else pathlib.Path(value)
+        return settings_conv(
+            pathlib.Path(plan['source']),
+            dest,
+            convert['lines'],
+            convert['dest_pattern'],
+            t.cast(pathlib.Path, None if self._settings.log is None else self._task_log(queue, task)),
+            workers = self._settings.workers,
+            index = _path(plan['index']),
+            checkpoint = convert['checkpoint'],
+            resume = True,
+            manifest = convert['manifest'],
+            previous = _path(convert['previous']),
+            bytes = convert['bytes'],
+            partitions = convert['partitions'],
+            log_bytes = self._settings.log_bytes,
+            log_compress = self._settings.log_compress,
+            stats = dest.joinpath(Worker._stats_name),
+            profile = self._settings.profile,
+            metadata = None if convert['metadata'] is None else dest.joinpath(Worker._metadata_name),
+            history = convert['history'],
+            ids_file = _path(convert['ids_file']),
+            title_regex = convert['title_regex'],
+            namespaces = convert['namespaces'],
+            sample_rate = convert['sample_rate'],
+            seed = convert['seed'],
+            quiet = self._settings.quiet,
+            progress = self._settings.progress,
+            read_queue = self._settings.read_queue,
+            read_block = self._settings.read_block,
+            write_queue = self._settings.write_queue,
+            write_block = self._settings.write_block,
+            span = queue.span(task))
@@ -1,2 +1,7 @@
+from .Benchmark import Benchmark as Benchmark
 from .Convert import Convert as Convert
+from .Lookup import Lookup as Lookup
+from .Merge import Merge as Merge
 from .Metadata import Metadata as Metadata
+from .Plan import Plan as Plan
+from .Worker import Worker as Worker
@@ -1,7 +1,37 @@
+from .csv_helper import CsvWriter as CsvWriter
 from .extract_helper import extract_id as extract_id
+from .extract_helper import extract_revision as extract_revision
+from .extract_helper import extract_sha1 as extract_sha1
 from .extract_helper import extract_text as extract_text
 from .extract_helper import extract_title as extract_title
+from .filter_helper import PageFilter as PageFilter
+from .fs_helper import find_page as find_page
 from .fs_helper import list_revisions as list_revisions
-from .fs_helper import write_log as write_log
+from .fs_helper import split_source as split_source
+from .index_helper import ArticleIndex as ArticleIndex
+from .index_helper import IndexWriter as IndexWriter
+from .index_helper import index_name as index_name
+from .index_helper import titles_name as titles_name
+from .index_helper import write_titles as write_titles
+from .log_helper import ErrorLog as ErrorLog
+from .log_helper import combine_logs as combine_logs
+from .manifest_helper import ManifestWriter as ManifestWriter
+from .manifest_helper import PreviousRun as PreviousRun
+from .manifest_helper import extract_text_or_reuse as extract_text_or_reuse
+from .manifest_helper import file_fields as file_fields
+from .manifest_helper import manifest_fields as manifest_fields
+from .manifest_helper import write_files as write_files
 from .pipeline_helper import extract_articles as extract_articles
+from .pipeline_helper import extract_shards as extract_shards
+from .pipeline_helper import iter_articles as iter_articles
 from .progress_helper import progress_overlay as progress_overlay
+from .progress_helper import source_position as source_position
+from .queue_helper import TaskQueue as TaskQueue
+from .scan_helper import scan_revisions as scan_revisions
+from .stats_helper import StatsReport as StatsReport
+from .stats_helper import record as record_stage
+from .synth_helper import write_synthetic_dump as write_synthetic_dump
+from .synth_helper import write_synthetic_history as write_synthetic_history
+from .thread_helper import WriteBehind as WriteBehind
+from .token_helper import TokenShard as TokenShard
+from .token_helper import write_token_shards as write_token_shards
@@ -0,0 +1,56 @@
+import csv
+import io
+import os
+import pathlib
+import typing as t
+from ..dtypes import Article
+from . import thread_helper
+
+_block_size = 1 << 16
+
+class CsvWriter:
+    """
+    Writes the chosen fields of each article as a row of a CSV
+    The rows are gathered as text and written as UTF-8 bytes a block at a time, through `writer` when it is given.
+    """
+
+    def __init__(self, path: pathlib.Path, fields: t.List[str], size: int | None = None, writer: thread_helper.WriteBehind | None = None):
+        self._fields = fields
+        if size is not None:
+            os.truncate(path, size)
+        mode = 'wb' if size is None else 'ab'
+        self._fp: t.Any = open(path, mode) if writer is None else writer.open(path, mode)
+        self._text = io.StringIO()
+        self._writer = csv.writer(self._text, delimiter = ',', quotechar = '"', quoting = csv.QUOTE_ALL)
+        if size is None:
+            self._writer.writerow(fields)
+
+    def write(self, article: Article) -> None:
+        fields = self._fields
+        row: t.List[str | None] = [None] * len(fields)
+        for i in range(0, len(fields)):
+            if fields[i] in article:
+                val = article[fields[i]]
+                if val is not None:
+                    row[i] = str(val)
+        self._writer.writerow(row)
+        if self._text.tell() >= _block_size:
+            self._drain()
+
+    def sync(self) -> int:
+        """
+        Makes sure the CSV is on disk and returns its size
+        """
+        self._drain()
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+        return self._fp.tell()
+
+    def close(self) -> None:
+        self._drain()
+        self._fp.close()
+
+    def _drain(self) -> None:
+        self._fp.write(self._text.getvalue().encode('utf-8'))
+        self._text.seek(0)
+        self._text.truncate()
@@ -1,7 +1,12 @@
 import html
-import mwparserfromhell as parser # type: ignore
+from mwparserfromhell.parser import tokens # type: ignore
 import mwxml # type: ignore
+import re
 import typing as t
+try:
+    from mwparserfromhell.parser._tokenizer import CTokenizer as _Tokenizer # type: ignore
+except ImportError:
+    from mwparserfromhell.parser.tokenizer import Tokenizer as _Tokenizer # type: ignore
 
 def extract_id(revision: mwxml.iteration.Revision) -> int | None:
     if revision.page is not None:
@@ -11,80 +16,177 @@ def extract_title(revision: mwxml.iteration.Revision) -> str | None:
     if revision.page is not None:
         return revision.page.title
 
+def extract_revision(revision: mwxml.iteration.Revision) -> int | None:
+    return revision.id
+
+def extract_sha1(revision: mwxml.iteration.Revision) -> str | None:
+    return revision.sha1
+
 def extract_text(revision: mwxml.iteration.Revision) -> t.List[str] | None:
     if revision.text is not None:
-        wiki_code = parser.parse(revision.text) # type: ignore
-        text = ''.join(map(_extract_text, wiki_code.nodes)) # type: ignore
+        if _markup.search(revision.text) is None:
+            text = revision.text
+        else:
+            text = _extract_text(_Tokenizer().tokenize(revision.text, 0, False))
         paragraphs = _clean_article(text)
         return paragraphs
 
-def _extract_text(node: parser.nodes.Node) -> str:
+_markup = re.compile(r"[\[\]{}<>&':]|^[=*#;-]", re.MULTILINE)
+
+_opens = frozenset([
+    tokens.TemplateOpen, tokens.ArgumentOpen, tokens.WikilinkOpen, tokens.ExternalLinkOpen,
+    tokens.HTMLEntityStart, tokens.HeadingStart, tokens.CommentStart, tokens.TagOpenOpen
+])
+_closes = frozenset([
+    tokens.TemplateClose, tokens.ArgumentClose, tokens.WikilinkClose, tokens.ExternalLinkClose,
+    tokens.HTMLEntityEnd, tokens.HeadingEnd, tokens.CommentEnd, tokens.TagCloseSelfclose, tokens.TagCloseClose
+])
+_separators = frozenset([tokens.WikilinkSeparator, tokens.ExternalLinkSeparator, tokens.TagCloseOpen, tokens.TagOpenClose])
+
+class _Frame(t.NamedTuple):
+    """
+    A construct whose text is being extracted
+    `filtered` drops each child that has 'thumb|' in its text, `checked` means this frame is such a child.
+    `mark` is where the frame's text starts in the output buffer.
     """
-    Extracts the text from a wiki node
+    filtered: bool
+    checked: bool
+    mark: int
+
+_Handler = t.Callable[[t.List[t.Any], int, t.List[str], t.List[_Frame]], int]
+
+def _extract_text(token_list: t.List[t.Any]) -> str:
+    """
+    Extracts the text from the wiki tokens
     There are a lot of cases where wiki markup has characters that are for programing, not reading.
     We want to prune these out.
+    The tokens are read straight from the tokenizer, no node tree is built.
+    Each token type is looked up in `_handlers`, nested constructs are tracked with a stack and all the text goes into one buffer.
     """
-    if isinstance(node, parser.nodes.Wikilink):
-        return _extract_text_Wikilink(node)
-    elif isinstance(node, parser.nodes.Text):
-        return str(node)
-    elif isinstance(node, parser.nodes.Tag):
-        return _extract_text_Tag(node)
-    elif isinstance(node, parser.nodes.HTMLEntity):
-        return _extract_text_html(node)
-    elif isinstance(node, parser.nodes.Template):
-        return ''
-    elif isinstance(node, parser.nodes.Heading):  
-        return ''
-    elif isinstance(node, parser.nodes.external_link.ExternalLink):
-        return _extract_text_ExternalLink(node)
-    elif isinstance(node, parser.nodes.Comment):
-        return ''
-    elif isinstance(node, parser.nodes.Argument):
-        return ''
-    else:
-        raise Exception('unknown type: ' + str(type(node)) + ' ' + str(node))
+    out: t.List[str] = []
+    stack: t.List[_Frame] = []
+    i = 0
+    while i < len(token_list):
+        handler = _handlers.get(type(token_list[i]))
+        if handler is None:
+            raise Exception('unknown type: ' + str(type(token_list[i])) + ' ' + str(token_list[i]))
+        i = handler(token_list, i, out, stack)
+    return ''.join(out)
 
-def _extract_text_Wikilink(node: parser.nodes.Wikilink) -> str:
-    if node.title.startswith('File:') or node.title.startswith('Image:'): # type: ignore
-        if node.text is None: # type: ignore
-            return ''
-        else:
-            return ''.join(filter(lambda x: 'thumb|' not in x, map(_extract_text, node.text.nodes))) # type: ignore
-    else:
-        return ''.join(map(_extract_text, node.title.nodes)) # type: ignore
+def _skip(token_list: t.List[t.Any], i: int) -> int:
+    """
+    Moves past the current part of a construct
+    Returns the index of the separator or close token that ends it.
+    """
+    depth = 0
+    while True:
+        kind = type(token_list[i])
+        if kind in _opens:
+            depth += 1
+        elif kind in _closes:
+            if depth == 0:
+                return i
+            depth -= 1
+        elif depth == 0 and kind in _separators:
+            return i
+        i += 1
 
-def _extract_text_ExternalLink(node: parser.nodes.external_link.ExternalLink) -> str:
-    if isinstance(node.title, parser.wikicode.Wikicode): # type: ignore
-        return ''.join(map(_extract_text, node.title.nodes)) # type: ignore
-    else:
-        return ''
+def _push(out: t.List[str], stack: t.List[_Frame], filtered: bool = False) -> None:
+    checked = len(stack) > 0 and stack[-1].filtered
+    stack.append(_Frame(filtered, checked, len(out)))
 
-def _extract_text_Tag(node: parser.nodes.Tag) -> str:
-    if isinstance(node.contents, parser.wikicode.Wikicode): # type: ignore
-        return ''.join(map(_extract_text, node.contents.nodes)) # type: ignore
+def _pop(out: t.List[str], stack: t.List[_Frame]) -> None:
+    frame = stack.pop()
+    if frame.checked and 'thumb|' in ''.join(out[frame.mark:]):
+        del out[frame.mark:]
+
+def _extract_text_Text(token_list: t.List[t.Any], i: int, out: t.List[str], stack: t.List[_Frame]) -> int:
+    text = token_list[i].text
+    if len(stack) == 0 or not stack[-1].filtered or 'thumb|' not in text:
+        out.append(text)
+    return i + 1
+
+def _extract_text_Wikilink(token_list: t.List[t.Any], i: int, out: t.List[str], stack: t.List[_Frame]) -> int:
+    title = ''
+    j = i + 1
+    while type(token_list[j]) is tokens.Text:
+        title += token_list[j].text
+        j += 1
+    if title.startswith('File:') or title.startswith('Image:'):
+        j = _skip(token_list, i + 1)
+        if type(token_list[j]) is tokens.WikilinkSeparator:
+            _push(out, stack, True)
+        return j + 1
+    _push(out, stack)
+    return i + 1
+
+def _extract_text_WikilinkSeparator(token_list: t.List[t.Any], i: int, out: t.List[str], stack: t.List[_Frame]) -> int:
+    _pop(out, stack)
+    return _skip(token_list, i + 1) + 1
+
+def _extract_text_ExternalLink(token_list: t.List[t.Any], i: int, out: t.List[str], stack: t.List[_Frame]) -> int:
+    j = _skip(token_list, i + 1)
+    if type(token_list[j]) is tokens.ExternalLinkSeparator:
+        _push(out, stack)
+    return j + 1
+
+def _extract_text_Tag(token_list: t.List[t.Any], i: int, out: t.List[str], stack: t.List[_Frame]) -> int:
+    j = _skip(token_list, i + 1)
+    if type(token_list[j]) is tokens.TagCloseOpen:
+        _push(out, stack)
+    return j + 1
+
+def _extract_text_TagOpenClose(token_list: t.List[t.Any], i: int, out: t.List[str], stack: t.List[_Frame]) -> int:
+    """
+    The closing tag is skipped up to and including its TagCloseClose, so that token never needs a handler of its own
+    """
+    _pop(out, stack)
+    return _skip(token_list, i + 1) + 1
+
+def _extract_text_close(token_list: t.List[t.Any], i: int, out: t.List[str], stack: t.List[_Frame]) -> int:
+    _pop(out, stack)
+    return i + 1
+
+def _extract_text_html(token_list: t.List[t.Any], i: int, out: t.List[str], stack: t.List[_Frame]) -> int:
+    if type(token_list[i + 1]) is not tokens.HTMLEntityNumeric:
+        entity = f'&{token_list[i + 1].text};'
+        end = i + 2
+    elif type(token_list[i + 2]) is tokens.HTMLEntityHex:
+        entity = f'&#{token_list[i + 2].char}{token_list[i + 3].text};'
+        end = i + 4
     else:
-        return ''
+        entity = f'&#{token_list[i + 2].text};'
+        end = i + 3
+    out.append(html.unescape(entity))
+    return end + 1
+
+def _skip_all(token_list: t.List[t.Any], i: int, out: t.List[str], stack: t.List[_Frame]) -> int:
+    return _skip(token_list, i + 1) + 1
 
-def _extract_text_html(node: parser.nodes.html_entity.HTMLEntity) -> str:
-    return html.unescape(str(node))
+_handlers: t.Dict[type, _Handler] = {
+    tokens.Text: _extract_text_Text,
+    tokens.WikilinkOpen: _extract_text_Wikilink,
+    tokens.WikilinkSeparator: _extract_text_WikilinkSeparator,
+    tokens.WikilinkClose: _extract_text_close,
+    tokens.ExternalLinkOpen: _extract_text_ExternalLink,
+    tokens.ExternalLinkClose: _extract_text_close,
+    tokens.TagOpenOpen: _extract_text_Tag,
+    tokens.TagOpenClose: _extract_text_TagOpenClose,
+    tokens.HTMLEntityStart: _extract_text_html,
+    tokens.TemplateOpen: _skip_all,
+    tokens.HeadingStart: _skip_all,
+    tokens.CommentStart: _skip_all,
+    tokens.ArgumentOpen: _skip_all
+}
 
 def _clean_article(text: str) -> t.List[str]:
-    lines = text.splitlines()
-    t1 = map(lambda line: line.strip(), lines)
-    t2 = filter(lambda line: line != '', t1)
-    t3 = filter(lambda line: line.upper() != 'THUMB', t2)
-    lines = list(t3)
-    t4 = reversed(lines)
-    t5 = _clean_leading_categories(t4)
-    lines = list(t5)
-    t6 = reversed(lines)
-    lines = list(t6)
+    """
+    Keeps the stripped lines that are not empty or a bare "thumb", then drops the "Category:" lines at the end
+    The lines are gathered in one list and the categories are cut off it in place.
+    """
+    lines = [line for line in map(str.strip, text.splitlines()) if line != '' and line.upper() != 'THUMB']
+    end = len(lines)
+    while end > 0 and lines[end - 1].startswith('Category:'):
+        end -= 1
+    del lines[end:]
     return lines
-
-def _clean_leading_categories(lines: t.Iterator[str]) -> t.Iterator[str]:
-    has_content = False
-    for line in lines:
-        if not line.startswith("Category:") or has_content:
-            has_content = True
-            yield line
\ No newline at end of file
@@ -0,0 +1,56 @@
+import hashlib
+import pathlib
+import re
+import typing as t
+
+_loaded: t.Dict[pathlib.Path, t.Set[int]] = {}
+
+class PageFilter:
+    """
+    Picks the pages to keep from their id and title, before any revision is read
+    Only the path of the ids file is pickled.
+    Each process loads the ids once, the first time they are used.
+    """
+
+    def __init__(self, ids_file: pathlib.Path | None = None, title_regex: str | None = None, namespaces: t.List[int] | None = None, sample_rate: float = 1.0, seed: int = 0):
+        self._ids_file = ids_file
+        self._title_regex = title_regex
+        self._title = None if title_regex is None else re.compile(title_regex)
+        self._namespaces = None if namespaces is None else frozenset(namespaces)
+        self._sample_rate = sample_rate
+        self._seed = seed
+
+    def __getstate__(self) -> t.Dict[str, t.Any]:
+        return {'ids_file': self._ids_file, 'title_regex': self._title_regex, 'namespaces': self._namespaces, 'sample_rate': self._sample_rate, 'seed': self._seed}
+
+    def __setstate__(self, state: t.Dict[str, t.Any]) -> None:
+        self.__init__(state['ids_file'], state['title_regex'], state['namespaces'], state['sample_rate'], state['seed'])
+
+    @property
+    def namespaces(self) -> t.FrozenSet[int] | None:
+        return self._namespaces
+
+    def reject(self, page_id: int | None, title: str | None) -> str | None:
+        """
+        Returns the reason the page is not wanted: ids, title or sample
+        The sample is a hash of the seed and page id, so the same pages are picked no matter the order they are read in.
+        """
+        if self._ids_file is not None:
+            if self._ids_file not in _loaded:
+                _loaded[self._ids_file] = read_ids(self._ids_file)
+            if page_id not in _loaded[self._ids_file]:
+                return 'ids'
+        if self._title is not None and (title is None or self._title.search(title) is None):
+            return 'title'
+        if self._sample_rate < 1.0:
+            digest = hashlib.blake2b(f'{self._seed}:{page_id}'.encode('utf-8'), digest_size = 8).digest()
+            if int.from_bytes(digest, 'little') >= self._sample_rate * (1 << 64):
+                return 'sample'
+        return None
+
+def read_ids(path: pathlib.Path) -> t.Set[int]:
+    """
+    Reads one page id per line, blank lines are ignored
+    """
+    with open(path, 'r', encoding = 'utf-8') as fp:
+        return {int(line) for line in fp if line.strip() != ''}
@@ -1,22 +1,52 @@
-import json
+import bisect
+import bz2
+import functools
+import io
+import itertools
 import mwxml # type: ignore
 import pathlib
+import re
 import typing as t
-import uuid
-from ..dtypes import ProcessError
+from . import filter_helper, pool_helper, progress_helper, stats_helper, thread_helper
 
 T = t.TypeVar('T')
+Span = t.Tuple[int, int]
 
-def list_revisions(mediawiki_in: pathlib.Path) -> t.Iterator[mwxml.iteration.Revision]:
+_page_open = b'<page>'
+_dump_close = b'</mediawiki>'
+_block_size = 1024 * 1024
+_page_header_size = 4 * 1024
+_task_size = 8 * 1024 * 1024
+_stream_magic = re.compile(rb'BZh[1-9]1AY&SY')
+_stream_magic_size = 10
+
+def list_revisions(mediawiki_in: pathlib.Path, span: Span | None = None, index: pathlib.Path | None = None, workers: int = 1, after: int | None = None, page_filter: filter_helper.PageFilter | None = None, read_queue: int = 0, read_block: int = _block_size) -> t.Iterator[mwxml.iteration.Revision]:
     """
     Gets the full xml of the wiki article
     mediawiki files store a lot of extra history information.
     we only need the latest information
+    When a span is given, only the pages inside that byte range are read.
+    A multistream .bz2 dump is decompressed on the fly, in parallel when its index is given.
+    When `after` is given, the pages up to and including that page id are skipped.
+    When `page_filter` is given, the pages it rejects are dropped before their revisions are read.
+    When `read_queue` is given, the source is read `read_block` bytes at a time on a background thread that keeps that many blocks ready.
     """
-    with open(mediawiki_in, 'r', encoding = 'utf-8') as fp:
+    return stats_helper.timed(_list_revisions(mediawiki_in, span, index, workers, after, page_filter, read_queue, read_block), 'list_revisions')
+
+def _list_revisions(mediawiki_in: pathlib.Path, span: Span | None, index: pathlib.Path | None, workers: int, after: int | None, page_filter: filter_helper.PageFilter | None, read_queue: int, read_block: int) -> t.Iterator[mwxml.iteration.Revision]:
+    if after is not None and span is None and (index is not None or not _is_bz2(mediawiki_in)):
+        spans = split_source(mediawiki_in, 1, index, after)
+        if len(spans) == 0:
+            return
+        span = spans[0]
+    with open_source(mediawiki_in, span, index, workers, page_filter, read_queue, read_block) as fp:
         dump = mwxml.Dump.from_file(fp) # type: ignore
+        skipping = after is not None
         for page in dump: # type: ignore
-            page = _as_clean_page(page)
+            if skipping:
+                skipping = not isinstance(page, mwxml.Page) or page.id != after
+                continue
+            page = _as_clean_page(page, page_filter)
             if page is not None:
                 last_revision: mwxml.Revision | None = None
                 for revision in page: # type: ignore
@@ -24,34 +54,414 @@ def list_revisions(mediawiki_in: pathlib.Path) -> t.Iterator[mwxml.iteration.Rev
                         if revision.deleted is not None:
                             if not revision.deleted.text:
                                 last_revision = revision
-                if last_revision is not None and last_revision.model == 'wikitext':
+                if last_revision is None:
+                    stats_helper.count('skipped', 'deleted')
+                elif last_revision.model != 'wikitext':
+                    stats_helper.count('skipped', 'model')
+                else:
                     yield last_revision
+        stats_helper.record('list_revisions', 0, 0, fp.tell())
 
-def _as_clean_page(page: t.Any) -> mwxml.Page | None:
+def _as_clean_page(page: t.Any, page_filter: filter_helper.PageFilter | None) -> mwxml.Page | None:
     if not isinstance(page, mwxml.Page):
+        stats_helper.count('skipped', 'not_page')
         return None
-    if page.namespace is None or page.namespace != 0:
-        return None
-    if page.redirect is not None:
-        return None
-    if page.title is None or 'disambiguation' in page.title:
+    issue = page_issue(page.id, page.namespace, page.redirect, page.title, page_filter)
+    if issue is not None:
+        stats_helper.count('skipped', issue)
         return None
     return page
 
-def write_log(log: pathlib.Path, error: ProcessError) -> None:
+def page_issue(page_id: int | None, namespace: int | None, redirect: str | None, title: str | None, page_filter: filter_helper.PageFilter | None = None) -> str | None:
+    """
+    Only keep the articles: no redirects, disambiguation pages or other namespaces
+    The filter can let in other namespaces and narrows the articles down further.
+    Returns the reason the page is not kept.
     """
-    Writes out a message as a single file
+    namespaces = None if page_filter is None else page_filter.namespaces
+    if namespace is None or (namespace != 0 if namespaces is None else namespace not in namespaces):
+        return 'namespace'
+    if redirect is not None:
+        return 'redirect'
+    if title is None or 'disambiguation' in title:
+        return 'disambiguation'
+    if page_filter is not None:
+        return page_filter.reject(page_id, title)
+    return None
+
+def split_source(mediawiki_in: pathlib.Path, count: int, index: pathlib.Path | None = None, after: int | None = None, size: int = 0, start: int | None = None) -> t.List[Span]:
+    """
+    Splits the dump into byte ranges that each start on a <page> boundary
+    Each range can be read on its own by `list_revisions`.
+    A multistream .bz2 dump is split on its stream boundaries, which requires the index.
+    Without the index, it can only be cut into one range from `start` on.
+
     Parameters
     ----------
-    log : pathlib.Path
-        The folder of raw messages
-    error : ProcessError
-        The error itself
-    """
-    issue = ''.join([tok.capitalize() for tok in error.issues[0].split(' ')])
-    path = log.joinpath(f'wikimedia.{issue}.{uuid.uuid4()}.json')
-    with open(path, 'w', encoding = 'utf-8', newline = '') as fp:
-        if error.document is None:
-            fp.write('Missing whole document')
+    mediawiki_in : pathlib.Path
+        The .xml or .bz2 file sourced from Wikimedia
+    count : int
+        The number of ranges wanted.
+        Fewer are returned when the pages are too large to split evenly.
+    index : pathlib.Path
+        The multistream index file
+    after : int
+        The page id to start from.
+        The first range starts at or before that page so it still needs to be skipped while reading.
+    size : int
+        When not 0, more ranges are made so that none is much larger than `size` bytes of the file
+    start : int
+        Where the first range starts, as found by `find_page` for `after`, so the page does not need to be searched for again
+    """
+    with open(mediawiki_in, 'rb') as fp:
+        if not _is_bz2(mediawiki_in):
+            first = start if start is not None else _find(fp, _page_open, 0) if after is None else _find_page(fp, after)
+            last = _rfind(fp, _dump_close)
+            return _split(first, last, count, lambda position: _find(fp, _page_open, position), size)
+        if index is None:
+            if start is None:
+                raise ValueError(f'{str(mediawiki_in)} can only be split using its index')
+            return _split(start, _last_stream(fp), 1, lambda position: None)
+        offsets = _stream_offsets(index)
+        if len(offsets) == 0:
+            return []
+        first = start if start is not None else offsets[0] if after is None else _find_stream(index, after)
+        last = _stream_end(fp, offsets[-1])
+        def _next(position: int) -> int | None:
+            i = bisect.bisect_left(offsets, position)
+            return offsets[i] if i < len(offsets) else None
+        return _split(first, last, count, _next, size)
+
+def find_page(mediawiki_in: pathlib.Path, page_id: int, position: int = 0, index: pathlib.Path | None = None) -> int | None:
+    """
+    Finds where to start reading to get to the page with the given id, the start of its <page> or of the bz2 stream holding it
+    The search goes back from `position`, a byte offset after the page such as how far the source had been read, and then on from it.
+    None is returned for a .bz2 without index that is not found to be a multistream dump, it can only be read from the start.
+    """
+    with open(mediawiki_in, 'rb') as fp:
+        if not _is_bz2(mediawiki_in):
+            return _find_page(fp, page_id, position)
+        if index is not None:
+            return _find_stream(index, page_id)
+        return _find_page_stream(fp, page_id, position)
+
+def _find_page(fp: t.BinaryIO, page_id: int, position: int = 0) -> int:
+    """
+    Finds the start of the <page> with the given id, searching back from `position` and then on from it
+    The blocks overlap by `_page_header_size` so a page header is never cut in two.
+    """
+    pattern = _page_pattern(page_id)
+    size = fp.seek(0, io.SEEK_END)
+    position = min(position, size)
+    for start, end in itertools.chain(_blocks_before(position), ((start, start + _block_size) for start in range(position, size, _block_size))):
+        fp.seek(start)
+        match = pattern.search(fp.read(end - start + _page_header_size))
+        if match is not None:
+            return start + match.start()
+    raise ValueError(f'page {page_id} was not found')
+
+def _page_pattern(page_id: int) -> re.Pattern[bytes]:
+    return re.compile(rb'<page>\s*<title>[^<]*</title>\s*<ns>[^<]*</ns>\s*<id>' + str(page_id).encode('utf-8') + rb'</id>')
+
+def _blocks_before(position: int) -> t.Iterator[Span]:
+    end = position
+    while end > 0:
+        start = max(0, end - _block_size)
+        yield (start, end)
+        end = start
+
+def _find_page_stream(fp: t.BinaryIO, page_id: int, position: int) -> int | None:
+    """
+    Finds the stream of a multistream .bz2 dump holding the page, going back from `position` one stream at a time
+    The first stream also holds the <siteinfo> header, so it is never returned.
+    """
+    pattern = _page_pattern(page_id)
+    for start in _stream_starts(fp, position):
+        if start == 0:
+            return None
+        data = _read_stream(fp, start)
+        if data is not None and pattern.search(data) is not None:
+            return start
+    return None
+
+def _last_stream(fp: t.BinaryIO) -> int | None:
+    """
+    Finds the start of the last stream of a multistream .bz2 dump, the one that only closes the dump
+    """
+    for start in _stream_starts(fp, fp.seek(0, io.SEEK_END)):
+        data = _read_stream(fp, start)
+        if data is not None:
+            return start if _page_open not in data else None
+    return None
+
+def _stream_starts(fp: t.BinaryIO, position: int) -> t.Iterator[int]:
+    """
+    Lists the offsets before `position` that look like the start of a bz2 stream, from the last one back
+    The bz2 header is followed by the magic number of the first block, so data inside a stream is rarely taken for one.
+    """
+    head = b''
+    for start, end in _blocks_before(position):
+        fp.seek(start)
+        window = fp.read(end - start) + head
+        matches = [match.start() for match in _stream_magic.finditer(window) if match.start() < end - start]
+        head = window[:_stream_magic_size - 1]
+        for i in reversed(matches):
+            yield start + i
+
+def _read_stream(fp: t.BinaryIO, start: int) -> bytes | None:
+    """
+    Decompresses the one stream at `start`, None when it is not really the start of a stream
+    """
+    try:
+        return b''.join(_decompress_blocks(_read_blocks(fp, start, None), 1))
+    except OSError:
+        return None
+
+def _find_stream(index: pathlib.Path, page_id: int) -> int:
+    """
+    Finds the offset of the bz2 stream holding the page with the given id
+    """
+    with (bz2.open(index, 'rt', encoding = 'utf-8') if _is_bz2(index) else open(index, 'r', encoding = 'utf-8')) as fp:
+        for line in fp:
+            parts = line.split(':', 2)
+            if int(parts[1]) == page_id:
+                return int(parts[0])
+    raise ValueError(f'page {page_id} was not found in {str(index)}')
+
+def _split(first: int | None, last: int | None, count: int, next_start: t.Callable[[int], int | None], size: int = 0) -> t.List[Span]:
+    if first is None or last is None or first >= last:
+        return []
+    if size > 0:
+        count = max(count, -(-(last - first) // size))
+    size = (last - first) // count
+    starts = [first]
+    for i in range(1, count):
+        start = next_start(max(first + i * size, starts[-1] + 1))
+        if start is None or start >= last:
+            break
+        starts.append(start)
+    ends = starts[1:] + [last]
+    return list(zip(starts, ends))
+
+def open_source(mediawiki_in: pathlib.Path, span: Span | None = None, index: pathlib.Path | None = None, workers: int = 1, page_filter: filter_helper.PageFilter | None = None, read_queue: int = 0, read_block: int = _block_size) -> t.BinaryIO:
+    """
+    Opens the dump, or a byte range of it, as a binary stream of uncompressed XML
+    With the index of a multistream .bz2 dump, the streams holding no page the filter can keep are never decompressed.
+    When `read_queue` is given, the reading and decompressing is done on a background thread that keeps up to `read_queue` blocks ready.
+    """
+    if span is not None:
+        chunks = _read_span(mediawiki_in, span, read_block)
+    elif not _is_bz2(mediawiki_in):
+        if read_queue == 0:
+            fp = open(mediawiki_in, 'rb', buffering = read_block)
+            progress_helper.watch_source(fp.tell)
+            return fp
+        chunks = _read_plain(mediawiki_in, read_block)
+    elif index is None:
+        chunks = _read_compressed(mediawiki_in, read_block)
+    else:
+        chunks = _read_streams(mediawiki_in, index, workers, page_filter, read_block)
+    if read_queue > 0:
+        chunks = thread_helper.read_ahead(chunks, read_queue)
+    return io.BufferedReader(_ChunkReader(chunks), read_block)
+
+def _is_bz2(path: pathlib.Path) -> bool:
+    return path.suffix.lower() == '.bz2'
+
+def _read_plain(mediawiki_in: pathlib.Path, block_size: int) -> t.Iterator[bytes]:
+    with open(mediawiki_in, 'rb', buffering = 0) as fp:
+        progress_helper.watch_source(fp.tell)
+        yield from _read_blocks(fp, 0, None, block_size)
+
+def _read_compressed(mediawiki_in: pathlib.Path, block_size: int = _block_size) -> t.Iterator[bytes]:
+    """
+    Decompresses the whole dump in order, keeping track of how far through the compressed file it is
+    """
+    with open(mediawiki_in, 'rb') as fp:
+        progress_helper.watch_source(fp.tell)
+        yield from _decompress_blocks(_read_blocks(fp, 0, None, block_size))
+
+def _read_span(mediawiki_in: pathlib.Path, span: Span, block_size: int = _block_size) -> t.Iterator[bytes]:
+    """
+    Reads a byte range of the dump wrapped in the <mediawiki>/<siteinfo> header so it parses as a whole dump
+    """
+    with open(mediawiki_in, 'rb') as fp:
+        progress_helper.watch_source(fp.tell)
+        if _is_bz2(mediawiki_in):
+            header = b''.join(_decompress_blocks(_read_blocks(fp, 0, None), 1))
+            yield header[:header.find(_page_open)] if _page_open in header else header
+            yield from _decompress_blocks(_read_blocks(fp, span[0], span[1], block_size))
         else:
-            fp.write(json.dumps(error.document.to_json()))
+            first = _find(fp, _page_open, 0)
+            if first is None:
+                return
+            fp.seek(0)
+            yield fp.read(first)
+            yield from _read_blocks(fp, span[0], span[1], block_size)
+        yield _dump_close + b'\n'
+
+def _read_streams(mediawiki_in: pathlib.Path, index: pathlib.Path, workers: int, page_filter: filter_helper.PageFilter | None = None, block_size: int = _block_size) -> t.Iterator[bytes]:
+    """
+    Decompresses each group of bz2 streams on its own, in parallel, keeping the original order
+    The streams only holding pages the filter rejects are left out, except the last one that closes the dump.
+    """
+    if page_filter is None:
+        offsets = _stream_offsets(index)
+        kept = set(offsets)
+    else:
+        offsets, kept = _filter_streams(index, page_filter)
+    with open(mediawiki_in, 'rb') as fp:
+        progress_helper.watch_source(fp.tell)
+        if len(offsets) == 0:
+            yield from _decompress_blocks(_read_blocks(fp, 0, None, block_size))
+            return
+        yield bz2.decompress(fp.read(offsets[0]))
+    bounds = offsets + [mediawiki_in.stat().st_size]
+    spans: t.List[Span] = []
+    for start, end in zip(bounds, bounds[1:]):
+        if start not in kept and end != bounds[-1]:
+            stats_helper.record('skip_streams', 0, 1, end - start)
+        elif len(spans) > 0 and spans[-1][1] == start and start - spans[-1][0] < _task_size:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+    for data, span in zip(pool_helper.map_ordered(functools.partial(_decompress_span, mediawiki_in), spans, workers), spans):
+        progress_helper.watch_source(lambda end = span[1]: end)
+        yield data
+
+def _decompress_span(mediawiki_in: pathlib.Path, span: Span) -> bytes:
+    with open(mediawiki_in, 'rb') as fp:
+        fp.seek(span[0])
+        return bz2.decompress(fp.read(span[1] - span[0]))
+
+def _decompress_blocks(blocks: t.Iterator[bytes], streams: int | None = None) -> t.Iterator[bytes]:
+    """
+    Decompresses one or more back to back bz2 streams
+    """
+    decompressor = bz2.BZ2Decompressor()
+    for block in blocks:
+        while len(block) > 0:
+            yield decompressor.decompress(block)
+            if not decompressor.eof:
+                break
+            if streams is not None:
+                streams -= 1
+                if streams == 0:
+                    return
+            block = decompressor.unused_data
+            decompressor = bz2.BZ2Decompressor()
+
+def _stream_offsets(index: pathlib.Path) -> t.List[int]:
+    """
+    Reads the sorted, distinct stream offsets from a multistream index
+    Each line is in the form "{offset}:{page id}:{title}".
+    """
+    offsets: t.List[int] = []
+    with (bz2.open(index, 'rt', encoding = 'utf-8') if _is_bz2(index) else open(index, 'r', encoding = 'utf-8')) as fp:
+        for line in fp:
+            offset = int(line.split(':', 1)[0])
+            if len(offsets) == 0 or offsets[-1] != offset:
+                offsets.append(offset)
+    return offsets
+
+def _filter_streams(index: pathlib.Path, page_filter: filter_helper.PageFilter) -> t.Tuple[t.List[int], t.Set[int]]:
+    """
+    Reads the stream offsets along with the offsets of the streams holding a page the filter might keep
+    Only the id and title are in the index, so the namespace is checked later.
+    """
+    offsets: t.List[int] = []
+    kept: t.Set[int] = set()
+    with (bz2.open(index, 'rt', encoding = 'utf-8') if _is_bz2(index) else open(index, 'r', encoding = 'utf-8')) as fp:
+        for line in fp:
+            parts = line.rstrip('\n').split(':', 2)
+            offset = int(parts[0])
+            if len(offsets) == 0 or offsets[-1] != offset:
+                offsets.append(offset)
+            if offset not in kept and page_filter.reject(int(parts[1]), parts[2]) is None:
+                kept.add(offset)
+    return offsets, kept
+
+def _stream_end(fp: t.BinaryIO, offset: int) -> int:
+    decompressor = bz2.BZ2Decompressor()
+    position = offset
+    for block in _read_blocks(fp, offset, None):
+        position += len(block)
+        decompressor.decompress(block)
+        if decompressor.eof:
+            return position - len(decompressor.unused_data)
+    return position
+
+def _read_blocks(fp: t.BinaryIO, start: int, end: int | None, block_size: int = _block_size) -> t.Iterator[bytes]:
+    fp.seek(start)
+    remaining = end - start if end is not None else None
+    while remaining is None or remaining > 0:
+        block = fp.read(block_size if remaining is None else min(remaining, block_size))
+        if len(block) == 0:
+            break
+        if remaining is not None:
+            remaining -= len(block)
+        yield block
+
+def _find(fp: t.BinaryIO, token: bytes, start: int) -> int | None:
+    fp.seek(start)
+    position = start
+    tail = b''
+    while True:
+        block = fp.read(_block_size)
+        if len(block) == 0:
+            return None
+        window = tail + block
+        i = window.find(token)
+        if i >= 0:
+            return position - len(tail) + i
+        position += len(block)
+        tail = window[-(len(token) - 1):]
+
+def _rfind(fp: t.BinaryIO, token: bytes) -> int | None:
+    end = fp.seek(0, io.SEEK_END)
+    head = b''
+    while end > 0:
+        start = max(0, end - _block_size)
+        fp.seek(start)
+        window = fp.read(end - start) + head
+        i = window.rfind(token)
+        if i >= 0:
+            return start + i
+        head = window[:len(token) - 1]
+        end = start
+    return None
+
+class _ChunkReader(io.RawIOBase):
+    """
+    Exposes a stream of byte chunks as a readable file
+    """
+
+    def __init__(self, chunks: t.Iterator[bytes]):
+        self._chunks = chunks
+        self._chunk = b''
+        self._offset = 0
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def readinto(self, buffer: t.Any) -> int:
+        while self._offset >= len(self._chunk):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._chunk = chunk
+            self._offset = 0
+        size = min(len(buffer), len(self._chunk) - self._offset)
+        buffer[:size] = self._chunk[self._offset:self._offset + size]
+        self._offset += size
+        self._position += size
+        return size
+
+    def close(self) -> None:
+        if hasattr(self._chunks, 'close'):
+            self._chunks.close() # type: ignore
+        super().close()
@@ -0,0 +1,324 @@
+import csv
+import heapq
+import itertools
+import mmap
+import os
+import pathlib
+import shutil
+import struct
+import typing as t
+
+Location = t.Tuple[str, int, int]
+
+index_name = 'wikimedia.index.bin'
+titles_name = 'wikimedia.titles.bin'
+
+_magic = b'WMINDEX1'
+_header = struct.Struct('<8sqq')
+_record = struct.Struct('<qqqq')
+_titles_magic = b'WMTITLE1'
+_titles_header = struct.Struct('<8sqqq')
+_title = struct.Struct('<qqq')
+_block_size = 1 << 20
+_sort_size = 1 << 20
+
+class IndexWriter:
+    """
+    Appends the page id, file id, byte offset and byte length of each saved article to a work file
+    The work file is sorted into the index by `close`.
+    """
+
+    def __init__(self, path: pathlib.Path, size: int | None = None):
+        self._path = path
+        self._work = path.with_name(f'{path.name}.tmp')
+        if size is None:
+            self._fp = open(self._work, 'wb')
+        else:
+            os.truncate(self._work, size)
+            self._fp = open(self._work, 'ab')
+
+    def write(self, page_id: int, file: int, offset: int, length: int) -> None:
+        self._fp.write(_record.pack(page_id, file, offset, length))
+
+    def sync(self) -> int:
+        """
+        Makes sure the work file is on disk and returns its size
+        """
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+        return self._fp.tell()
+
+    def close(self, dest_pattern: str | None = None) -> None:
+        """
+        Writes the index when given the pattern of the TXT file names, otherwise the work file is kept for a resume
+        The articles usually arrive in page order, then the work file is copied into the index as it is.
+        Otherwise it is sorted `_sort_size` records at a time into runs that are merged, so it is never all in memory.
+        """
+        self._fp.close()
+        if dest_pattern is None:
+            return
+        count = self._work.stat().st_size // _record.size
+        pattern = dest_pattern.encode('utf-8')
+        temp = self._path.with_name(f'{self._path.name}.part')
+        with open(temp, 'wb') as fp:
+            fp.write(_header.pack(_magic, count, len(pattern)))
+            fp.write(pattern)
+            if _is_sorted(self._work):
+                with open(self._work, 'rb') as work:
+                    shutil.copyfileobj(work, fp, _block_size)
+            else:
+                _merge_sort(self._work, fp)
+        os.replace(temp, self._path)
+        self._work.unlink()
+
+class ArticleIndex:
+    """
+    Finds an article in the TXT files of a convert run by page id, or by title when given the metadata CSV
+    The index is memory mapped and binary searched, so each lookup is one read of the TXT file.
+    Titles are looked up the same way in `wikimedia.titles.bin`, which is made from the metadata CSV when it is missing or was made from another file.
+    The TXT files are opened the first time they are read from and kept open until `close`.
+    """
+
+    def __init__(self, folder: pathlib.Path, metadata: pathlib.Path | None = None):
+        self._folder = folder
+        self._metadata = metadata
+        self._titles: mmap.mmap | None = None
+        self._files: t.Dict[int, t.BinaryIO] = {}
+        with open(folder.joinpath(index_name), 'rb') as fp:
+            self._map = mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, self._count, pattern = _header.unpack_from(self._map, 0)
+        if magic != _magic:
+            raise ValueError(f'{folder.joinpath(index_name)} is not an article index')
+        self._pattern = self._map[_header.size:(_header.size + pattern)].decode('utf-8')
+        self._start = _header.size + pattern
+
+    def __enter__(self) -> 'ArticleIndex':
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def pattern(self) -> str:
+        return self._pattern
+
+    def __contains__(self, page_id: int) -> bool:
+        return self._search(page_id) is not None
+
+    def locate(self, page_id: int) -> Location | None:
+        """
+        Gets the TXT file name, byte offset and byte length of the article
+        """
+        record = self._search(page_id)
+        if record is None:
+            return None
+        return (self._pattern.format(id = record[1]), record[2], record[3])
+
+    def get(self, page_id: int) -> str | None:
+        """
+        Gets the article the same as it is in the TXT file, header and all
+        """
+        record = self._search(page_id)
+        if record is None:
+            return None
+        _, file, offset, length = record
+        fp = self._files.get(file)
+        if fp is None:
+            fp = open(self._folder.joinpath(self._pattern.format(id = file)), 'rb')
+            self._files[file] = fp
+        fp.seek(offset)
+        return fp.read(length).decode('utf-8')
+
+    def find(self, title: str) -> str | None:
+        """
+        Gets the article by title
+        The title table is opened the first time a title is looked up.
+        """
+        if self._metadata is None:
+            raise ValueError('looking up a title needs the metadata CSV')
+        if self._titles is None:
+            self._titles = _open_titles(self._metadata, self._folder.joinpath(titles_name))
+        page_id = _search_title(self._titles, title.encode('utf-8'))
+        return None if page_id is None else self.get(page_id)
+
+    def records(self) -> t.Iterator[t.Tuple[int, int, int, int]]:
+        """
+        Gets the page id, file id, byte offset and byte length of every article in page order
+        """
+        return _record.iter_unpack(self._map[self._start:(self._start + self._count * _record.size)])
+
+    def close(self) -> None:
+        for fp in self._files.values():
+            fp.close()
+        self._files = {}
+        self._map.close()
+        if self._titles is not None:
+            self._titles.close()
+            self._titles = None
+
+    def _search(self, page_id: int) -> t.Tuple[int, int, int, int] | None:
+        lo = 0
+        hi = self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            record = _record.unpack_from(self._map, self._start + mid * _record.size)
+            if record[0] < page_id:
+                lo = mid + 1
+            elif record[0] > page_id:
+                hi = mid
+            else:
+                return record
+        return None
+
+def _read_records(path: pathlib.Path) -> t.Iterator[t.List[t.Tuple[int, int, int, int]]]:
+    """
+    Reads the records of a work file `_sort_size` at a time
+    """
+    with open(path, 'rb') as fp:
+        while True:
+            data = fp.read(_sort_size * _record.size)
+            if len(data) == 0:
+                return
+            yield list(_record.iter_unpack(data))
+
+def _is_sorted(path: pathlib.Path) -> bool:
+    last = -1
+    for records in _read_records(path):
+        for record in records:
+            if record[0] < last:
+                return False
+            last = record[0]
+    return True
+
+def _merge_sort(path: pathlib.Path, out: t.BinaryIO) -> None:
+    """
+    Sorts the records of a work file into `out`, each run of `_sort_size` records is sorted to its own file and the runs are merged
+    """
+    runs: t.List[pathlib.Path] = []
+    try:
+        for records in _read_records(path):
+            records.sort()
+            run = path.with_name(f'{path.name}.{len(runs)}')
+            runs.append(run)
+            with open(run, 'wb') as fp:
+                fp.write(b''.join(_record.pack(*record) for record in records))
+        files = [open(run, 'rb', buffering = _block_size) for run in runs]
+        try:
+            merged = heapq.merge(*[_read_run(fp) for fp in files])
+            for records in iter(lambda: list(itertools.islice(merged, _sort_size)), []):
+                out.write(b''.join(_record.pack(*record) for record in records))
+        finally:
+            for fp in files:
+                fp.close()
+    finally:
+        for run in runs:
+            run.unlink()
+
+def _read_run(fp: t.BinaryIO) -> t.Iterator[t.Tuple[int, int, int, int]]:
+    while True:
+        data = fp.read(_block_size - _block_size % _record.size)
+        if len(data) == 0:
+            return
+        yield from _record.iter_unpack(data)
+
+def write_titles(metadata: pathlib.Path, path: pathlib.Path) -> None:
+    """
+    Writes the title table of a metadata CSV, the page id of each title sorted by the UTF-8 bytes of the title
+    The header is followed by a record of the offset, length and page id of each title, then the titles themselves.
+    When a title is in the CSV more than once, the first one is kept.
+    The rows are sorted `_sort_size` at a time into runs that are merged, so the CSV is never all in memory.
+    """
+    stat = metadata.stat()
+    temp = path.with_name(f'{path.name}.part')
+    blob = path.with_name(f'{path.name}.blob')
+    runs: t.List[pathlib.Path] = []
+    try:
+        for rows in _read_title_rows(metadata):
+            rows.sort()
+            run = path.with_name(f'{path.name}.{len(runs)}')
+            runs.append(run)
+            with open(run, 'wb') as out:
+                out.write(b''.join(_title.pack(row, page_id, len(title)) + title for title, row, page_id in rows))
+        files = [open(run, 'rb', buffering = _block_size) for run in runs]
+        try:
+            count = 0
+            offset = 0
+            last = None
+            with open(temp, 'wb', buffering = _block_size) as fp, open(blob, 'w+b', buffering = _block_size) as titles:
+                fp.write(_titles_header.pack(_titles_magic, 0, stat.st_size, stat.st_mtime_ns))
+                for title, _, page_id in heapq.merge(*[_read_title_run(source) for source in files]):
+                    if title == last:
+                        continue
+                    fp.write(_title.pack(offset, len(title), page_id))
+                    titles.write(title)
+                    offset += len(title)
+                    count += 1
+                    last = title
+                titles.seek(0)
+                shutil.copyfileobj(titles, fp, _block_size)
+                fp.seek(0)
+                fp.write(_titles_header.pack(_titles_magic, count, stat.st_size, stat.st_mtime_ns))
+        finally:
+            for source in files:
+                source.close()
+        os.replace(temp, path)
+    finally:
+        for run in runs:
+            run.unlink()
+        blob.unlink(missing_ok = True)
+
+def _read_title_rows(path: pathlib.Path) -> t.Iterator[t.List[t.Tuple[bytes, int, int]]]:
+    """
+    Reads the title, row number and page id of the rows of a metadata CSV `_sort_size` at a time
+    The row number sorts the first of the rows with the same title ahead of the others.
+    """
+    with open(path, 'r', encoding = 'utf-8', newline = '') as fp:
+        reader = csv.reader(fp, delimiter = ',', quotechar = '"')
+        header = next(reader)
+        i_id, i_title = [header.index(x) for x in ['id', 'title']]
+        rows = ((row[i_title].encode('utf-8'), i, int(row[i_id])) for i, row in enumerate(reader) if row[i_title] != '')
+        yield from iter(lambda: list(itertools.islice(rows, _sort_size)), [])
+
+def _read_title_run(fp: t.BinaryIO) -> t.Iterator[t.Tuple[bytes, int, int]]:
+    while True:
+        data = fp.read(_title.size)
+        if len(data) == 0:
+            return
+        row, page_id, length = _title.unpack(data)
+        yield (fp.read(length), row, page_id)
+
+def _open_titles(metadata: pathlib.Path, path: pathlib.Path) -> mmap.mmap:
+    """
+    Maps the title table, writing it first when it is missing or the metadata CSV changed since it was written
+    """
+    stat = metadata.stat()
+    for _ in range(2):
+        if path.exists():
+            with open(path, 'rb') as fp:
+                titles = mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ)
+            magic, _, size, mtime = _titles_header.unpack_from(titles, 0)
+            if magic == _titles_magic and size == stat.st_size and mtime == stat.st_mtime_ns:
+                return titles
+            titles.close()
+        write_titles(metadata, path)
+    raise ValueError(f'{str(path)} is not a title table')
+
+def _search_title(titles: mmap.mmap, title: bytes) -> int | None:
+    _, count, _, _ = _titles_header.unpack_from(titles, 0)
+    start = _titles_header.size + count * _title.size
+    lo = 0
+    hi = count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        offset, length, page_id = _title.unpack_from(titles, _titles_header.size + mid * _title.size)
+        found = titles[(start + offset):(start + offset + length)]
+        if found < title:
+            lo = mid + 1
+        elif found > title:
+            hi = mid
+        else:
+            return page_id
+    return None
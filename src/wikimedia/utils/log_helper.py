@@ -0,0 +1,201 @@
+import gzip
+import json
+import os
+import pathlib
+import queue
+import shutil
+import threading
+import typing as t
+import zlib
+from ..dtypes import ProcessError
+
+class ErrorLog:
+    """
+    Appends each revision that did not process as one JSON line to `wikimedia.errors.{n:04}.jsonl` in the log folder
+    The lines are written by a background thread so the extraction never waits on the disk.
+    Once a file reaches `size` bytes the next one is started.
+    When closed, `wikimedia.errors.json` lists the number of errors and the file and line of each one by issue.
+    The files already in the folder, E.G. from before a resume, are kept and added to the index.
+    A page already logged with the same issues, E.G. one extracted again after a resume, is not logged a second time.
+    """
+
+    def __init__(self, log: pathlib.Path, size: int = 100000000, compress: bool = False, queue_size: int = 1000):
+        self._log = log
+        self._size = size
+        self._compress = compress
+        self._queue: queue.Queue[ProcessError | None] = queue.Queue(maxsize = queue_size)
+        self._index: t.Dict[str, t.Dict[str, t.Any]] = {}
+        self._logged: t.Set[t.Tuple[int, t.Tuple[str, ...]]] = set()
+        self._failure: BaseException | None = None
+        self._thread = threading.Thread(target = self._write_all, daemon = True)
+        self._thread.start()
+
+    def __enter__(self) -> 'ErrorLog':
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+    def write(self, error: ProcessError) -> None:
+        """
+        Queues the error, only waits when the writer is `queue_size` errors behind
+        """
+        if self._failure is not None:
+            raise self._failure
+        self._queue.put(error)
+
+    def close(self) -> None:
+        """
+        Writes out the queued errors and the index
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self._failure is not None:
+            raise self._failure
+
+    def _write_all(self) -> None:
+        fp: t.TextIO | None = None
+        line = 0
+        size = 0
+        try:
+            file_i = self._index_existing()
+            while True:
+                error = self._queue.get()
+                if error is None:
+                    break
+                record = _as_record(error)
+                if self._is_logged(record):
+                    continue
+                if fp is None:
+                    fp = self._open(file_i)
+                    line = 0
+                    size = 0
+                text = json.dumps(record) + '\n'
+                fp.write(text)
+                line += 1
+                size += len(text.encode('utf-8'))
+                self._add_to_index(record, self._file_name(file_i), line)
+                if size >= self._size:
+                    fp.close()
+                    fp = None
+                    file_i += 1
+            self._save_index()
+        except BaseException as failure:
+            self._failure = failure
+            while self._queue.get() is not None:
+                pass
+        finally:
+            if fp is not None:
+                fp.close()
+
+    def _index_existing(self) -> int:
+        """
+        Indexes the log files from earlier runs and returns the number of the next file
+        A run that was killed can leave a cut off record at the end of its last file.
+        The cut off record is truncated from a plain file, a .gz file is read up to where it was cut off.
+        """
+        file_i = 0
+        for path in sorted(self._log.glob('wikimedia.errors.*.jsonl*')):
+            if path.suffix == '.gz':
+                self._index_compressed(path)
+            else:
+                self._index_plain(path)
+            file_i = max(file_i, int(path.name.split('.')[2]) + 1)
+        return file_i
+
+    def _index_plain(self, path: pathlib.Path) -> None:
+        end = 0
+        with open(path, 'rb') as fp:
+            position = 0
+            for line, data in enumerate(fp, 1):
+                position += len(data)
+                record = _parse_record(data)
+                if record is not None:
+                    self._add_to_index(record, path.name, line)
+                    end = position
+        if end < path.stat().st_size:
+            os.truncate(path, end)
+
+    def _index_compressed(self, path: pathlib.Path) -> None:
+        with gzip.open(path, 'rb') as fp:
+            try:
+                for line, data in enumerate(fp, 1):
+                    record = _parse_record(data)
+                    if record is not None:
+                        self._add_to_index(record, path.name, line)
+            except (EOFError, OSError, zlib.error):
+                pass
+
+    def _is_logged(self, record: t.Dict[str, t.Any]) -> bool:
+        return record['page'] is not None and (record['page'], tuple(record['issues'])) in self._logged
+
+    def _add_to_index(self, record: t.Dict[str, t.Any], file_name: str, line: int) -> None:
+        if self._is_logged(record):
+            return
+        if record['page'] is not None:
+            self._logged.add((record['page'], tuple(record['issues'])))
+        for issue in record['issues']:
+            entry = self._index.setdefault(issue, {'count': 0, 'records': {}})
+            entry['count'] += 1
+            entry['records'].setdefault(file_name, []).append(line)
+
+    def _open(self, file_i: int) -> t.TextIO:
+        path = self._log.joinpath(self._file_name(file_i))
+        if self._compress:
+            return t.cast(t.TextIO, gzip.open(path, 'wt', encoding = 'utf-8', newline = ''))
+        return open(path, 'w', encoding = 'utf-8', newline = '')
+
+    def _file_name(self, file_i: int) -> str:
+        return f'wikimedia.errors.{file_i:04}.jsonl' + ('.gz' if self._compress else '')
+
+    def _save_index(self) -> None:
+        path = self._log.joinpath('wikimedia.errors.json')
+        temp = path.with_name(f'{path.name}.tmp')
+        with open(temp, 'w', encoding = 'utf-8') as fp:
+            json.dump(self._index, fp, indent = 2)
+        os.replace(temp, path)
+
+def combine_logs(folders: t.List[pathlib.Path], log: pathlib.Path) -> None:
+    """
+    Moves the log files of each folder into `log` and indexes them all
+    The files keep their order and are numbered on from the ones already in `log`.
+    A file is moved with one rename, so a combine that was stopped part way can be run again.
+    """
+    file_i = 1 + max([int(path.name.split('.')[2]) for path in log.glob('wikimedia.errors.*.jsonl*')], default = -1)
+    for folder in folders:
+        if not folder.exists():
+            continue
+        for path in sorted(folder.glob('wikimedia.errors.*.jsonl*')):
+            name = f'wikimedia.errors.{file_i:04}.jsonl' + ('.gz' if path.suffix == '.gz' else '')
+            os.replace(path, log.joinpath(name))
+            file_i += 1
+        shutil.rmtree(folder)
+    ErrorLog(log).close()
+
+def _parse_record(data: bytes) -> t.Dict[str, t.Any] | None:
+    """
+    Gets the record of one line, None when the line was cut off or is not a record
+    """
+    if not data.endswith(b'\n'):
+        return None
+    try:
+        record = json.loads(data)
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or not isinstance(record.get('issues'), list):
+        return None
+    record.setdefault('page', None)
+    return record
+
+def _as_record(error: ProcessError) -> t.Dict[str, t.Any]:
+    document = error.document
+    if document is None:
+        return {'issues': error.issues, 'page': None, 'title': None, 'document': None}
+    page = document.page
+    return {
+        'issues': error.issues,
+        'page': None if page is None else page.id,
+        'title': None if page is None else page.title,
+        'document': document.to_json()
+    }
@@ -0,0 +1,120 @@
+import csv
+import mwxml # type: ignore
+import os
+import pathlib
+import typing as t
+from . import extract_helper
+
+Location = t.Tuple[str, str, int, int]
+
+manifest_fields = ['id', 'revision', 'sha1', 'file', 'offset', 'length']
+file_fields = ['file', 'bytes', 'lines', 'articles', 'first', 'last']
+
+_loaded: t.Dict[pathlib.Path, t.Dict[int, Location]] = {}
+
+class PreviousRun:
+    """
+    The manifest and TXT files of an earlier convert run
+    Only the manifest path is pickled.
+    Each process loads the manifest once, the first time it is used.
+    """
+
+    def __init__(self, manifest: pathlib.Path):
+        self._manifest = manifest
+
+    def __getstate__(self) -> t.Dict[str, t.Any]:
+        return {'manifest': self._manifest}
+
+    def __setstate__(self, state: t.Dict[str, t.Any]) -> None:
+        self._manifest = state['manifest']
+
+    @property
+    def manifest(self) -> pathlib.Path:
+        return self._manifest
+
+    def find(self, page_id: int) -> Location | None:
+        """
+        Gets the sha1, file name, byte offset and byte length of the page from the earlier run
+        """
+        if self._manifest not in _loaded:
+            _loaded[self._manifest] = read_manifest(self._manifest)
+        return _loaded[self._manifest].get(page_id)
+
+    def read_paragraphs(self, location: Location) -> t.List[str]:
+        """
+        Rebuilds the paragraphs of a saved article
+        Joining the sentences back together with a space splits into the same sentences again.
+        """
+        _, file_name, offset, length = location
+        with open(self._manifest.parent.joinpath(file_name), 'rb') as fp:
+            fp.seek(offset)
+            lines = fp.read(length).decode('utf-8').splitlines()
+        paragraphs: t.List[str] = []
+        sentences: t.List[str] = []
+        for line in lines[lines.index('') + 1:]:
+            if line == '':
+                paragraphs.append(' '.join(sentences))
+                sentences = []
+            else:
+                sentences.append(line)
+        return paragraphs
+
+def read_manifest(path: pathlib.Path) -> t.Dict[int, Location]:
+    entries: t.Dict[int, Location] = {}
+    with open(path, 'r', encoding = 'utf-8', newline = '') as fp:
+        reader = csv.reader(fp, delimiter = ',', quotechar = '"')
+        header = next(reader)
+        i_id, i_sha1, i_file, i_offset, i_length = [header.index(x) for x in ['id', 'sha1', 'file', 'offset', 'length']]
+        for row in reader:
+            entries[int(row[i_id])] = (row[i_sha1], row[i_file], int(row[i_offset]), int(row[i_length]))
+    return entries
+
+def extract_text_or_reuse(previous: PreviousRun, revision: mwxml.iteration.Revision) -> t.List[str] | None:
+    """
+    Reuses the article from the earlier run when the revision has not changed since
+    """
+    if revision.page is not None and revision.sha1 is not None:
+        location = previous.find(revision.page.id)
+        if location is not None and location[0] == revision.sha1:
+            return previous.read_paragraphs(location)
+    return extract_helper.extract_text(revision)
+
+class ManifestWriter:
+    """
+    Appends the location of each saved article to the manifest CSV
+    """
+
+    def __init__(self, path: pathlib.Path, size: int | None = None):
+        if size is None:
+            self._fp = open(path, 'w', encoding = 'utf-8', newline = '')
+            self._writer = csv.writer(self._fp, delimiter = ',', quotechar = '"', quoting = csv.QUOTE_ALL)
+            self._writer.writerow(manifest_fields)
+        else:
+            os.truncate(path, size)
+            self._fp = open(path, 'a', encoding = 'utf-8', newline = '')
+            self._writer = csv.writer(self._fp, delimiter = ',', quotechar = '"', quoting = csv.QUOTE_ALL)
+
+    def write(self, page_id: int, revision_id: int | None, sha1: str | None, file_name: str, offset: int, length: int) -> None:
+        self._writer.writerow([page_id, revision_id, sha1, file_name, offset, length])
+
+    def sync(self) -> int:
+        """
+        Makes sure the manifest is on disk and returns its size
+        """
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+        return self._fp.tell()
+
+    def close(self) -> None:
+        self._fp.close()
+
+def write_files(path: pathlib.Path, files: t.Dict[str, t.List[int]]) -> None:
+    """
+    Lists each TXT file with its bytes, lines, articles, first page id and last page id
+    Readers can split the work between them from this list without opening the TXT files.
+    """
+    with open(path, 'w', encoding = 'utf-8', newline = '') as fp:
+        writer = csv.writer(fp, delimiter = ',', quotechar = '"', quoting = csv.QUOTE_ALL)
+        writer.writerow(file_fields)
+        for file_name, stats in files.items():
+            writer.writerow([file_name] + stats)
@@ -1,27 +1,162 @@
+import functools
+import itertools
 import mwxml # type: ignore
+import pathlib
+import time
 import typing as t
 from ..dtypes import Article, Extractor, ProcessError
+from . import extract_helper, filter_helper, fs_helper, pool_helper, progress_helper, scan_helper, stats_helper
 
-def extract_articles(revisions: t.Iterator[mwxml.iteration.Revision], fields: t.Dict[str, Extractor], log: t.Callable[[ProcessError], None]) -> t.Iterator[Article]:
+Reader = t.Callable[..., t.Iterator[mwxml.iteration.Revision]]
+
+_extractors: t.Dict[str, Extractor] = {
+    'id': extract_helper.extract_id,
+    'title': extract_helper.extract_title,
+    'revision': extract_helper.extract_revision,
+    'sha1': extract_helper.extract_sha1,
+    'text': extract_helper.extract_text
+}
+_shard_size = 1024 * 1024
+
+def iter_articles(source: pathlib.Path | str, fields: t.Iterable[str] | t.Dict[str, Extractor] = ('id', 'title', 'text'), workers: int = 1, batch_size: int = 100, shards: int = 1, index: pathlib.Path | str | None = None, log: t.Callable[[ProcessError], None] | None = None, history: bool = False, page_filter: filter_helper.PageFilter | None = None, limit: int = 0) -> t.Iterator[t.List[Article]]:
+    """
+    Streams the articles of a dump in lists of up to `batch_size`, in page order
+    `fields` names the fields to extract: id, title, revision, sha1 and text, or maps the names to custom extractors.
+    When the text is not asked for, it is skipped over without being parsed.
+    When `history` is set, only the text of the revision that is kept is decoded, for full history dumps.
+    The pages `page_filter` rejects are dropped before their text is read and no more than `limit` articles are returned when it is not 0.
+    With `history` or a `page_filter`, the dump is read by the byte scanner, so the text of a page that is not kept is never decoded.
+    Nothing is read ahead of the consumer except the batches in flight, at most 2 per worker, so a slow consumer slows the parsing down.
+    Stopping early, E.G. with `break` or `close()`, shuts the workers down and closes the source.
+    Articles that do not process are passed to `log`, or dropped when there is none.
+    """
+    source = pathlib.Path(source)
+    index = None if index is None else pathlib.Path(index)
+    if batch_size <= 0:
+        raise ValueError(f'{batch_size} must be > 0')
+    if isinstance(fields, dict):
+        extractors = dict(fields)
+        reader: Reader = functools.partial(scan_helper.scan_revisions, text = True) if history or page_filter is not None else fs_helper.list_revisions
+    else:
+        names = list(fields)
+        unknown = [name for name in names if name not in _extractors]
+        if len(unknown) > 0:
+            raise ValueError(f"unknown fields: {', '.join(unknown)}")
+        extractors = {name: _extractors[name] for name in names}
+        if 'text' not in extractors:
+            reader = scan_helper.scan_revisions
+        elif history or page_filter is not None:
+            reader = functools.partial(scan_helper.scan_revisions, text = True)
+        else:
+            reader = fs_helper.list_revisions
+    reader = functools.partial(reader, page_filter = page_filter)
+    on_error = _ignore if log is None else log
+    if shards > 1:
+        articles = extract_shards(source, shards, extractors, on_error, workers, index, reader)
+    else:
+        articles = extract_articles(reader(source, None, index, workers), extractors, on_error, workers, batch_size)
+    limited = articles if limit <= 0 else itertools.islice(articles, limit)
+    try:
+        while True:
+            batch = list(itertools.islice(limited, batch_size))
+            if len(batch) == 0:
+                return
+            yield batch
+    finally:
+        articles.close() # type: ignore
+
+def extract_articles(revisions: t.Iterator[mwxml.iteration.Revision], fields: t.Dict[str, Extractor], log: t.Callable[[ProcessError], None], workers: int = 1, batch_size: int = 100) -> t.Iterator[Article]:
     """
     Extracts an article's named fields from the string representation
+    When there is more than 1 worker, the revisions are sent to a process pool in batches.
+    The articles always come back in the same order as the revisions.
     """
+    if workers <= 1:
+        for result in _extract_records(revisions, fields):
+            if isinstance(result, ProcessError):
+                log(result)
+            else:
+                yield result
+    else:
+        for results in _extract_batches(revisions, fields, workers, batch_size):
+            for result in results:
+                if isinstance(result, ProcessError):
+                    log(result)
+                else:
+                    yield result
+
+def extract_shards(mediawiki_in: pathlib.Path, count: int, fields: t.Dict[str, Extractor], log: t.Callable[[ProcessError], None], workers: int = 1, index: pathlib.Path | None = None, reader: Reader = fs_helper.list_revisions, after: int | None = None, start: int | None = None) -> t.Iterator[Article]:
+    """
+    Splits the dump into `count` byte ranges that are read, parsed and extracted by separate workers
+    The ranges are stitched back together so the articles come back in page order.
+    A range larger than `_shard_size` bytes is cut into smaller ones, so only a few of those are held at a time however large the dump is.
+    `reader` lists the revisions inside one range.
+    When `after` is given, the pages up to and including that page id are skipped.
+    `start` is where that page was found by `find_page`, so it is not searched for again.
+    """
+    spans = fs_helper.split_source(mediawiki_in, count, index, after, _shard_size, start)
+    tasks = [(span, after if i == 0 else None) for i, span in enumerate(spans)]
+    for results, (span, _) in zip(pool_helper.map_ordered(functools.partial(_extract_span, mediawiki_in, fields = fields, reader = reader), tasks, workers), tasks):
+        progress_helper.watch_source(lambda end = span[1]: end)
+        for result in results:
+            if isinstance(result, ProcessError):
+                log(result)
+            else:
+                yield result
+
+def _extract_batches(revisions: t.Iterator[mwxml.iteration.Revision], fields: t.Dict[str, Extractor], workers: int, batch_size: int) -> t.Iterator[t.List[Article | ProcessError]]:
+    revisions = iter(revisions)
+    batches = iter(lambda: list(itertools.islice(revisions, batch_size)), [])
+    return pool_helper.map_ordered(functools.partial(_extract_batch, fields = fields), batches, workers)
+
+def _extract_span(mediawiki_in: pathlib.Path, task: t.Tuple[fs_helper.Span, int | None], fields: t.Dict[str, Extractor], reader: Reader) -> t.List[Article | ProcessError]:
+    span, after = task
+    return _extract_batch(reader(mediawiki_in, span, after = after), fields)
+
+def _extract_batch(revisions: t.Iterable[mwxml.iteration.Revision], fields: t.Dict[str, Extractor]) -> t.List[Article | ProcessError]:
+    return list(_extract_records(revisions, fields))
+
+def _extract_records(revisions: t.Iterable[mwxml.iteration.Revision], fields: t.Dict[str, Extractor]) -> t.Iterator[Article | ProcessError]:
+    """
+    Fills an `Article` for each revision, every article shares the one layout made from `fields`
+    The extractors run without a guard each, once one fails the rest run through `_extract_failed` so every failing field is still reported.
+    """
+    names = list(fields.keys())
+    extractors = list(fields.values())
+    stages = [f'extract_{name}' for name in names]
+    layout = Article.layout(names)
+    record = stats_helper.record
+    clock = time.perf_counter
     for revision in revisions:
+        values: t.List[t.Any] = [None] * len(extractors)
+        i = 0
+        start = clock()
         try:
-            yield _extract_article(revision, fields)
-        except ProcessError as error:
-            log(error)
-
-def _extract_article(revision: mwxml.iteration.Revision, fields: t.Dict[str, Extractor]) -> Article:
-    article: Article = {}
-    fails: t.List[str] = []
-    for name, extractor in fields.items():
+            for i, extractor in enumerate(extractors):
+                start = clock()
+                values[i] = extractor(revision)
+                record(stages[i], clock() - start)
+        except:
+            record(stages[i], clock() - start)
+            yield _extract_failed(revision, names, extractors, stages, i)
+            continue
+        yield Article(layout, tuple(values))
+
+def _extract_failed(revision: mwxml.iteration.Revision, names: t.List[str], extractors: t.List[Extractor], stages: t.List[str], failed: int) -> ProcessError:
+    """
+    Runs the extractors after the one that failed, each on its own, to find every field that does not process
+    """
+    fails = [names[failed]]
+    stats_helper.count('errors', names[failed])
+    for i in range(failed + 1, len(extractors)):
+        start = time.perf_counter()
         try:
-            value = extractor(revision)
-            if value is not None:
-                article[name] = value
+            extractors[i](revision)
         except:
-            fails.append(name)
-    if len(fails) > 0:
-        raise ProcessError(revision, [f'Failure {name}' for name in fails])
-    return article
+            fails.append(names[i])
+            stats_helper.count('errors', names[i])
+        stats_helper.record(stages[i], time.perf_counter() - start)
+    return ProcessError(revision, [f'Failure {name}' for name in fails])
+
+def _ignore(error: ProcessError) -> None:
+    pass
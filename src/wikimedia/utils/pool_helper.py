@@ -0,0 +1,49 @@
+import collections
+import concurrent.futures as cf
+import multiprocessing
+import typing as t
+from . import stats_helper
+
+T = t.TypeVar('T')
+U = t.TypeVar('U')
+
+def map_ordered(call: t.Callable[[T], U], items: t.Iterable[T], workers: int) -> t.Iterator[U]:
+    """
+    Maps the items across a process pool keeping the original order
+    At most 2 items per worker are in flight so memory stays bounded when the consumer is slow.
+    The stats counted by the workers are added to the stats of this process.
+    When the consumer stops early, the items not yet started are cancelled.
+    The workers are started fresh, never forked from this process, so they can not inherit a lock another thread is holding.
+    """
+    if workers <= 1:
+        yield from map(call, items)
+        return
+    with cf.ProcessPoolExecutor(max_workers = workers, mp_context = _context()) as pool:
+        pending: t.Deque[cf.Future[t.Tuple[U, stats_helper.Snapshot]]] = collections.deque()
+        try:
+            for item in items:
+                pending.append(pool.submit(_call_counted, call, item))
+                if len(pending) >= workers * 2:
+                    yield _result(pending.popleft())
+            while len(pending) > 0:
+                yield _result(pending.popleft())
+        finally:
+            for future in pending:
+                future.cancel()
+
+def _context() -> t.Any:
+    """
+    The forkserver forks the workers from a clean process that has no threads, spawn is used where there is none
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+def _call_counted(call: t.Callable[[T], U], item: T) -> t.Tuple[U, stats_helper.Snapshot]:
+    stats_helper.reset()
+    result = call(item)
+    return result, stats_helper.snapshot()
+
+def _result(future: 'cf.Future[t.Tuple[U, stats_helper.Snapshot]]') -> U:
+    result, counted = future.result()
+    stats_helper.merge(counted)
+    return result
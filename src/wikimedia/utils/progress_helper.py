@@ -1,13 +1,132 @@
+import datetime
+import pathlib
 import progressbar as pb # type: ignore
+import threading
+import time
 import typing as t
 
 T = t.TypeVar('T')
 
-def progress_overlay(items: t.Iterator[T], title: str) -> t.Iterator[T]:
-    bar_i = 0
-    widgets = [title, ' ', pb.Counter(), ' ', pb.Timer(), ' ', pb.BouncingBar(marker = '.', left = '[', right = ']')]
-    with pb.ProgressBar(widgets = widgets) as bar:
+_source: t.Callable[[], int] | None = None
+_position = 0
+
+def watch_source(position: t.Callable[[], int]) -> None:
+    """
+    Sets how to get the byte position in the source file being read, compressed bytes for a compressed file
+    """
+    global _source
+    _source = position
+
+def source_position() -> int:
+    """
+    Gets how far through the source file the reader is, 0 when it is not known
+    Once the source is closed, the last position read is kept.
+    """
+    global _position
+    if _source is not None:
+        try:
+            _position = _source()
+        except (ValueError, OSError):
+            pass
+    return _position
+
+def progress_overlay(items: t.Iterator[T], title: str, source: pathlib.Path | None = None, quiet: bool = False, interval: float | None = None) -> t.Iterator[T]:
+    """
+    Shows how far through the source the run is, the MB/s, the items/s and a smoothed ETA
+    The items are only counted as they pass, the display is refreshed by a timer every `interval` seconds.
+    When `quiet` is set, a plain line is printed each time instead of a bar, once a minute unless `interval` is given.
+    """
+    global _source, _position
+    _source = None
+    _position = 0
+    total = source.stat().st_size if source is not None else None
+    progress = _Progress(title, total, quiet, (60 if quiet else 1) if interval is None else interval)
+    progress.start()
+    try:
         for item in items:
-            bar_i = bar_i + 1
-            bar.update(bar_i) # type: ignore
+            progress.items += 1
             yield item
+        progress.finished = True
+    finally:
+        progress.stop()
+
+class _Progress:
+
+    def __init__(self, title: str, total: int | None, quiet: bool, interval: float):
+        self.items = 0
+        self.finished = False
+        self._title = title
+        self._total = total
+        self._interval = interval
+        self._start = 0.0
+        self._last = (0.0, 0)
+        self._position = 0
+        self._speed: float | None = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target = self._refresh, daemon = True)
+        self._text = pb.FormatCustomText('%(done)s %(speed)s %(rate)s ETA %(eta)s', {'done': '', 'speed': '', 'rate': '', 'eta': ''})
+        self._bar: pb.ProgressBar | None = None
+        if not quiet:
+            if total is None:
+                widgets = [title, ' ', pb.Counter(), ' ', pb.Timer(), ' ', pb.BouncingBar(marker = '.', left = '[', right = ']')]
+                self._bar = pb.ProgressBar(widgets = widgets, max_value = pb.UnknownLength)
+            else:
+                widgets = [title, ' ', pb.Percentage(), ' ', pb.Bar(marker = '.', left = '[', right = ']'), ' ', self._text, ' ', pb.Timer()]
+                self._bar = pb.ProgressBar(widgets = widgets, max_value = total)
+
+    def start(self) -> None:
+        self._start = time.perf_counter()
+        self._last = (self._start, 0)
+        if self._bar is not None:
+            self._bar.start()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._show()
+        if self._bar is not None:
+            self._bar.finish()
+
+    def _refresh(self) -> None:
+        while not self._stop.wait(self._interval):
+            self._show()
+
+    def _show(self) -> None:
+        now = time.perf_counter()
+        self._read_position()
+        last_time, last_position = self._last
+        if now > last_time and self._position >= last_position:
+            speed = (self._position - last_position) / (now - last_time)
+            self._speed = speed if self._speed is None else 0.3 * speed + 0.7 * self._speed
+        self._last = (now, self._position)
+        elapsed = now - self._start
+        rate = self.items / elapsed if elapsed > 0 else 0.0
+        if self._total is None:
+            if self._bar is not None:
+                self._bar.update(self.items)
+            else:
+                print(f'{self._title} {self.items} {rate:.0f}/s {_clock(elapsed)}', flush = True)
+            return
+        position = min(self._position, self._total)
+        speed = self._speed or 0.0
+        eta = _clock((self._total - position) / speed) if speed > 0 else '--:--:--'
+        done = f'{position / 1000000:.1f}/{self._total / 1000000:.1f} MB'
+        if self._bar is not None:
+            self._text.update_mapping(done = done, speed = f'{speed / 1000000:.1f} MB/s', rate = f'{rate:.0f} items/s', eta = eta)
+            self._bar.update(position)
+        else:
+            print(f'{self._title} {self.items} {100 * position / max(self._total, 1):.1f}% {done} {speed / 1000000:.1f} MB/s {rate:.0f} items/s elapsed {_clock(elapsed)} ETA {eta}', flush = True)
+
+    def _read_position(self) -> None:
+        source = _source
+        if self.finished and self._total is not None:
+            self._position = self._total
+        elif source is not None:
+            try:
+                self._position = source()
+            except (ValueError, OSError):
+                pass
+
+def _clock(seconds: float) -> str:
+    return str(datetime.timedelta(seconds = int(seconds)))
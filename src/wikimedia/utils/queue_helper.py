@@ -0,0 +1,163 @@
+import json
+import os
+import pathlib
+import shutil
+import threading
+import time
+import typing as t
+
+plan_name = 'wikimedia.plan.json'
+lease_interval = 60
+
+class TaskQueue:
+    """
+    A folder on a shared filesystem holding the byte range tasks of one conversion
+    Each task has a marker file that is renamed from `todo` to `claimed` by the worker that takes it.
+    A rename is atomic, so when several workers go for the same task only one of them gets it.
+    A worker converts its task into `work` and renames the finished folder into `done`.
+    While it works, the worker touches its marker every `lease_interval` seconds, so a marker that has not been touched for a long time belongs to a worker that is gone.
+    """
+
+    def __init__(self, folder: pathlib.Path):
+        self._folder = folder
+        with open(folder.joinpath(plan_name), 'r', encoding = 'utf-8') as fp:
+            self._plan: t.Dict[str, t.Any] = json.load(fp)
+
+    @staticmethod
+    def create(folder: pathlib.Path, plan: t.Dict[str, t.Any]) -> 'TaskQueue':
+        """
+        Starts the queue over with one task for each of the plan's `tasks`
+        The plan is written last, so workers never see a queue that is half made.
+        """
+        if folder.exists():
+            shutil.rmtree(folder)
+        for name in ['todo', 'claimed', 'work', 'done']:
+            folder.joinpath(name).mkdir(parents = True)
+        for task in range(len(plan['tasks'])):
+            folder.joinpath('todo', _task_name(task)).touch()
+        temp = folder.joinpath(f'{plan_name}.part')
+        with open(temp, 'w', encoding = 'utf-8') as fp:
+            json.dump(plan, fp, indent = 2)
+        os.replace(temp, folder.joinpath(plan_name))
+        return TaskQueue(folder)
+
+    @property
+    def plan(self) -> t.Dict[str, t.Any]:
+        return self._plan
+
+    @property
+    def tasks(self) -> int:
+        return len(self._plan['tasks'])
+
+    def span(self, task: int) -> t.Tuple[int, int]:
+        start, end = self._plan['tasks'][task]
+        return (start, end)
+
+    def claim(self, worker: str, steal_after: float = 0) -> int | None:
+        """
+        Takes the next task, or returns None when there are none left
+        The tasks `worker` claimed before it was stopped come first so they can resume from their checkpoint.
+        A marker left on a task that is already done, by a worker stopped inside `finish`, is dropped.
+        When `steal_after` is given, a task whose marker has not been touched for that many seconds is taken over once the todo tasks run out.
+        """
+        claimed = self._folder.joinpath('claimed')
+        markers = []
+        for name in sorted(os.listdir(claimed)):
+            number, owner = name.split('.', 1)
+            if self.done_folder(int(number)).exists():
+                claimed.joinpath(name).unlink(missing_ok = True)
+            else:
+                markers.append((int(number), owner))
+        mine = [task for task, owner in markers if owner == worker]
+        if len(mine) > 0:
+            return mine[0]
+        todo = self._folder.joinpath('todo')
+        for name in sorted(os.listdir(todo)):
+            try:
+                os.rename(todo.joinpath(name), claimed.joinpath(f'{name}.{worker}'))
+            except FileNotFoundError:
+                continue
+            return int(name)
+        if steal_after > 0:
+            for task, owner in markers:
+                if self._steal(task, owner, worker, steal_after):
+                    return task
+        return None
+
+    def _steal(self, task: int, owner: str, worker: str, steal_after: float) -> bool:
+        """
+        The marker is touched before it is renamed, so no other worker sees the new name as stale
+        Only one of the workers going for the same marker gets to rename it.
+        """
+        marker = self._marker(task, owner)
+        try:
+            if time.time() - marker.stat().st_mtime < steal_after:
+                return False
+            os.utime(marker)
+            os.rename(marker, self._marker(task, worker))
+        except FileNotFoundError:
+            return False
+        print(f'{worker} took over task {task + 1} from {owner}')
+        return True
+
+    def lease(self, task: int, worker: str) -> '_Lease':
+        """
+        Touches the marker of the task every `lease_interval` seconds until closed
+        """
+        return _Lease(self._marker(task, worker))
+
+    def work_folder(self, task: int) -> pathlib.Path:
+        return self._folder.joinpath('work', _task_name(task))
+
+    def done_folder(self, task: int) -> pathlib.Path:
+        return self._folder.joinpath('done', _task_name(task))
+
+    def finish(self, task: int, worker: str) -> None:
+        """
+        Publishes the output of the task and drops the claim
+        """
+        os.rename(self.work_folder(task), self.done_folder(task))
+        self._marker(task, worker).unlink(missing_ok = True)
+
+    def _marker(self, task: int, worker: str) -> pathlib.Path:
+        return self._folder.joinpath('claimed', f'{_task_name(task)}.{worker}')
+
+    def missing(self) -> t.List[int]:
+        """
+        Lists the tasks that are not done yet
+        """
+        return [task for task in range(self.tasks) if not self.done_folder(task).exists()]
+
+class _Lease:
+    """
+    Keeps a claim marker fresh from a background thread
+    `lost` is set once the marker is gone, E.G. because another worker took the task over.
+    """
+
+    def __init__(self, marker: pathlib.Path):
+        self._marker = marker
+        self._stop = threading.Event()
+        self.lost = False
+        self._thread = threading.Thread(target = self._refresh, daemon = True)
+        self._thread.start()
+
+    def __enter__(self) -> '_Lease':
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _refresh(self) -> None:
+        while not self._stop.wait(lease_interval):
+            try:
+                os.utime(self._marker)
+            except FileNotFoundError:
+                self.lost = True
+                return
+
+def _task_name(task: int) -> str:
+    return f'{task:05}'
@@ -0,0 +1,240 @@
+import html
+import mwtypes # type: ignore
+import pathlib
+import re
+import typing as t
+from . import filter_helper, fs_helper, stats_helper
+
+_attribute = re.compile(rb'(\w+)="([^"]*)"')
+
+def scan_revisions(mediawiki_in: pathlib.Path, span: fs_helper.Span | None = None, index: pathlib.Path | None = None, workers: int = 1, after: int | None = None, text: bool = False, page_filter: filter_helper.PageFilter | None = None, read_queue: int = 0, read_block: int = fs_helper._block_size) -> t.Iterator[mwtypes.Revision]:
+    """
+    Gets the page metadata of each article without reading the revision text
+    The XML is scanned tag by tag and the <text> bodies are skipped over as raw bytes.
+    The same pages as `list_revisions` are returned, but each revision has no text.
+    When `text` is set, the raw text of the newest revision that can be kept is held and decoded once the page ends.
+    The older revisions are dropped as soon as a newer one replaces them, so a page with a long history needs no more memory than its 2 largest revisions.
+    A page that is not kept, E.G. because `page_filter` rejects it, is skipped over from its first revision to its end.
+    `read_queue` and `read_block` are the same as for `list_revisions`.
+    """
+    return stats_helper.timed(_scan_revisions(mediawiki_in, span, index, workers, after, text, page_filter, read_queue, read_block), 'scan_revisions')
+
+def _scan_revisions(mediawiki_in: pathlib.Path, span: fs_helper.Span | None, index: pathlib.Path | None, workers: int, after: int | None, text: bool, page_filter: filter_helper.PageFilter | None, read_queue: int, read_block: int) -> t.Iterator[mwtypes.Revision]:
+    if after is not None and span is None and (index is not None or not fs_helper._is_bz2(mediawiki_in)):
+        spans = fs_helper.split_source(mediawiki_in, 1, index, after)
+        if len(spans) == 0:
+            return
+        span = spans[0]
+    with fs_helper.open_source(mediawiki_in, span, index, workers, page_filter, read_queue, read_block) as fp:
+        scanner = _Scanner(fp)
+        if not scanner.skip(b'<page>'):
+            return
+        skipping = after is not None
+        while True:
+            page = _scan_page(scanner, text, page_filter)
+            if page is None:
+                break
+            if skipping:
+                skipping = page.id != after
+                continue
+            issue = page.issue if page.checked else fs_helper.page_issue(page.id, page.namespace, page.redirect, page.title, page_filter)
+            if issue is None:
+                if page.revision is None:
+                    issue = 'deleted'
+                elif page.revision.model != 'wikitext':
+                    issue = 'model'
+            if issue is None:
+                yield page.as_revision()
+            else:
+                stats_helper.count('skipped', issue)
+        stats_helper.record('scan_revisions', 0, 0, fp.tell())
+
+class _PageScan:
+    __slots__ = ('id', 'title', 'namespace', 'redirect', 'revision', 'checked', 'issue')
+
+    def __init__(self):
+        self.id: int | None = None
+        self.title: str | None = None
+        self.namespace: int | None = None
+        self.redirect: str | None = None
+        self.revision: _RevisionScan | None = None
+        self.checked: bool = False
+        self.issue: str | None = None
+
+    def as_revision(self) -> mwtypes.Revision:
+        """
+        The text, sha1 and model are kept in the main slot, the same as `mwxml`, so they survive being sent to a worker
+        """
+        scan = t.cast(_RevisionScan, self.revision)
+        page = mwtypes.Page(self.id, self.title, self.namespace, redirect = self.redirect)
+        text = None if not scan.text else _decode_text(scan.text)
+        main = mwtypes.Content(role = 'main', model = scan.model, sha1 = scan.sha1, text = text)
+        return mwtypes.Revision(scan.id, scan.timestamp, page = page, slots = mwtypes.Slots(scan.sha1, {'main': main}), deleted = mwtypes.Revision.Deleted(text = False)) # type: ignore
+
+class _RevisionScan:
+    __slots__ = ('id', 'timestamp', 'model', 'sha1', 'text_deleted', 'text')
+
+    def __init__(self):
+        self.id: int | None = None
+        self.timestamp: str | None = None
+        self.model: str | None = None
+        self.sha1: str | None = None
+        self.text_deleted: bool = False
+        self.text: bytes | None = None
+
+def _scan_page(scanner: '_Scanner', text: bool = False, page_filter: filter_helper.PageFilter | None = None) -> _PageScan | None:
+    """
+    Reads one <page> element, the opening tag has already been consumed
+    Only the last revision with text that was not deleted is kept, same as `list_revisions`.
+    When `text` is set, the raw text of each revision is read and dropped again once a newer revision is kept.
+    The page is checked once its header has been read, at the first <revision>, and the rest is skipped when it is not kept.
+    Returns None once the end of the dump is reached.
+    """
+    page = _PageScan()
+    revision: _RevisionScan | None = None
+    while True:
+        tag = scanner.next_tag()
+        if tag is None:
+            return None
+        name = tag.split(None, 1)[0].rstrip(b'/') if len(tag) > 0 else b''
+        empty = tag.endswith(b'/')
+        if name == b'/page':
+            if not scanner.skip(b'<page>'):
+                scanner.close()
+            return page
+        elif name == b'revision':
+            if not page.checked:
+                page.checked = True
+                page.issue = fs_helper.page_issue(page.id, page.namespace, page.redirect, page.title, page_filter)
+                if page.issue is not None:
+                    if not scanner.skip(b'</page>') or not scanner.skip(b'<page>'):
+                        scanner.close()
+                    return page
+            revision = _RevisionScan()
+        elif name == b'/revision':
+            if revision is not None and not revision.text_deleted:
+                page.revision = revision
+            revision = None
+        elif empty:
+            if name == b'text' and revision is not None:
+                revision.text_deleted = b'deleted=' in tag
+                if text and not revision.text_deleted:
+                    revision.text = b''
+            elif name == b'redirect':
+                attributes = dict(_attribute.findall(tag))
+                if b'title' in attributes:
+                    page.redirect = _decode(attributes[b'title'])
+        elif revision is not None:
+            if name == b'text':
+                revision.text_deleted = b'deleted=' in tag
+                if text:
+                    revision.text = scanner.text(b'</text>')
+                else:
+                    scanner.skip(b'</text>')
+            elif name == b'id':
+                revision.id = int(scanner.text(b'</id>'))
+            elif name == b'timestamp':
+                revision.timestamp = scanner.text(b'</timestamp>').decode('utf-8')
+            elif name == b'model':
+                revision.model = scanner.text(b'</model>').decode('utf-8')
+            elif name == b'sha1':
+                revision.sha1 = scanner.text(b'</sha1>').decode('utf-8')
+            elif name == b'contributor' or name == b'comment':
+                scanner.skip(b'</' + name + b'>')
+        elif name == b'title':
+            page.title = _decode(scanner.text(b'</title>')).replace('_', ' ')
+        elif name == b'ns':
+            page.namespace = int(scanner.text(b'</ns>'))
+        elif name == b'id':
+            page.id = int(scanner.text(b'</id>'))
+
+def _decode(value: bytes) -> str:
+    text = value.decode('utf-8')
+    return html.unescape(text) if '&' in text else text
+
+def _decode_text(value: bytes) -> str:
+    """
+    Decodes the raw <text> body the same as an XML parser: line ends are normalized and the entities are replaced
+    """
+    if b'\r' in value:
+        value = value.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    return _decode(value)
+
+class _Scanner:
+    """
+    Walks the tags of a binary XML stream keeping only a small window in memory
+    """
+
+    def __init__(self, fp: t.BinaryIO):
+        self._fp = fp
+        self._buffer = b''
+        self._position = 0
+        self._done = False
+
+    def _fill(self) -> bool:
+        if self._done:
+            return False
+        block = self._fp.read(fs_helper._block_size)
+        if len(block) == 0:
+            self._done = True
+            return False
+        self._buffer = self._buffer[self._position:] + block
+        self._position = 0
+        return True
+
+    def _find(self, token: bytes, keep: bool) -> int:
+        """
+        Finds the token after the current position
+        Unless `keep` is set, bytes that can not be part of the token are dropped while searching.
+        """
+        start = self._position
+        while True:
+            i = self._buffer.find(token, start)
+            if i >= 0:
+                return i
+            start = max(self._position, len(self._buffer) - len(token) + 1)
+            if not keep:
+                self._position = start
+            shift = self._position
+            if not self._fill():
+                return -1
+            start -= shift
+
+    def skip(self, token: bytes) -> bool:
+        """
+        Moves past the next `token` without holding onto what was skipped
+        """
+        i = self._find(token, False)
+        if i < 0:
+            return False
+        self._position = i + len(token)
+        return True
+
+    def text(self, token: bytes) -> bytes:
+        """
+        Gets the bytes up to the next `token` and moves past it
+        """
+        i = self._find(token, True)
+        if i < 0:
+            i = len(self._buffer)
+        value = self._buffer[self._position:i]
+        self._position = min(i + len(token), len(self._buffer))
+        return value
+
+    def next_tag(self) -> bytes | None:
+        """
+        Gets the contents of the next <...> tag and moves past it
+        """
+        if not self.skip(b'<'):
+            return None
+        i = self._find(b'>', True)
+        if i < 0:
+            return None
+        tag = self._buffer[self._position:i]
+        self._position = i + 1
+        return tag
+
+    def close(self) -> None:
+        self._done = True
+        self._buffer = b''
+        self._position = 0
@@ -0,0 +1,170 @@
+import collections
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+import typing as t
+
+T = t.TypeVar('T')
+Snapshot = t.Dict[str, t.Any]
+
+_lock = threading.Lock()
+_stages: t.Dict[str, t.List[float]] = {}
+_counts: t.Dict[str, t.Dict[str, int]] = {}
+
+def _after_fork() -> None:
+    """
+    A pool can be forked from a background thread, E.G. the read ahead, while another thread holds the lock
+    The child gets a copy of the held lock that nothing will release, so it starts over with a new one.
+    """
+    global _lock
+    _lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child = _after_fork)
+
+def record(stage: str, seconds: float, items: int = 1, size: int = 0) -> None:
+    """
+    Adds the time, items and bytes of one unit of work to a pipeline stage
+    """
+    with _lock:
+        totals = _stages.get(stage)
+        if totals is None:
+            _stages[stage] = [seconds, items, size]
+        else:
+            totals[0] += seconds
+            totals[1] += items
+            totals[2] += size
+
+def count(group: str, key: str, n: int = 1) -> None:
+    """
+    Counts an event, E.G. why a page was skipped or which field failed
+    """
+    with _lock:
+        keys = _counts.setdefault(group, {})
+        keys[key] = keys.get(key, 0) + n
+
+def timed(items: t.Iterable[T], stage: str) -> t.Iterator[T]:
+    """
+    Records the time spent getting each item
+    """
+    iterator = iter(items)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                record(stage, time.perf_counter() - start, 0)
+                return
+            record(stage, time.perf_counter() - start)
+            yield item
+    finally:
+        if hasattr(iterator, 'close'):
+            iterator.close() # type: ignore
+
+def snapshot() -> Snapshot:
+    with _lock:
+        return {'stages': {k: list(v) for k, v in _stages.items()}, 'counts': {k: dict(v) for k, v in _counts.items()}}
+
+def merge(other: Snapshot) -> None:
+    """
+    Adds the counters from another process
+    """
+    for stage, (seconds, items, size) in other['stages'].items():
+        record(stage, seconds, int(items), int(size))
+    for group, keys in other['counts'].items():
+        for key, n in keys.items():
+            count(group, key, n)
+
+def reset() -> None:
+    with _lock:
+        _stages.clear()
+        _counts.clear()
+
+class StatsReport:
+    """
+    Writes the counters to a JSON file every `interval` seconds and once more at the end of the run
+    When `profile` is set, the stack of the main thread is also sampled to find the hot paths.
+    `io` holds the queue and block sizes of the run so the timings can be compared between settings.
+    """
+
+    def __init__(self, path: pathlib.Path | None, profile: bool = False, interval: float = 60, rate: float = 0.01, io: t.Dict[str, int] | None = None):
+        self._path = path
+        self._io = {} if io is None else io
+        self._profile = profile
+        self._interval = interval
+        self._rate = rate
+        self._samples: t.Counter[t.Tuple[str, str, int]] = collections.Counter()
+        self._samples_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: t.List[threading.Thread] = []
+        self._start = 0.0
+
+    def __enter__(self) -> 'StatsReport':
+        reset()
+        self._start = time.perf_counter()
+        if self._path is not None:
+            self._threads.append(threading.Thread(target = self._report, daemon = True))
+            if self._profile:
+                self._threads.append(threading.Thread(target = self._sample, args = (threading.get_ident(),), daemon = True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        if self._path is not None:
+            self._write(True)
+
+    def _report(self) -> None:
+        while not self._stop.wait(self._interval):
+            self._write(False)
+
+    def _sample(self, ident: int) -> None:
+        """
+        Counts the functions on the stack, each function is counted once per sample
+        """
+        while not self._stop.wait(self._rate):
+            frame = sys._current_frames().get(ident)
+            seen = set()
+            while frame is not None:
+                code = frame.f_code
+                seen.add((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            with self._samples_lock:
+                self._samples.update(seen)
+
+    def _write(self, finished: bool) -> None:
+        elapsed = time.perf_counter() - self._start
+        state = snapshot()
+        stages = {}
+        for stage, (seconds, items, size) in sorted(state['stages'].items()):
+            stages[stage] = {
+                'seconds': seconds,
+                'items': int(items),
+                'bytes': int(size),
+                'items_per_second': items / seconds if seconds > 0 else 0.0
+            }
+        report: t.Dict[str, t.Any] = {
+            'finished': finished,
+            'elapsed': elapsed,
+            'pid': os.getpid(),
+            'io': self._io,
+            'stages': stages,
+            'skipped': state['counts'].get('skipped', {}),
+            'errors': state['counts'].get('errors', {})
+        }
+        if self._profile:
+            with self._samples_lock:
+                hot = self._samples.most_common(50)
+            report['profile'] = [{'function': name, 'file': file, 'line': line, 'samples': n} for (name, file, line), n in hot]
+        path = t.cast(pathlib.Path, self._path)
+        temp = path.with_name(f'{path.name}.tmp')
+        with open(temp, 'w', encoding = 'utf-8') as fp:
+            json.dump(report, fp, indent = 2)
+        os.replace(temp, path)
@@ -0,0 +1,125 @@
+import hashlib
+import pathlib
+import random
+import typing as t
+from xml.sax.saxutils import escape, quoteattr
+
+_words = [
+    'the', 'of', 'and', 'in', 'to', 'was', 'is', 'for', 'on', 'as', 'by', 'with', 'he', 'she', 'at', 'from', 'his', 'her',
+    'an', 'were', 'are', 'which', 'this', 'also', 'be', 'first', 'new', 'after', 'had', 'city', 'world', 'river', 'war',
+    'state', 'team', 'album', 'film', 'school', 'species', 'season', 'church', 'village', 'county', 'music', 'party'
+]
+_names = ['Paris', 'London', 'Amazon', 'Mozart', 'Python', 'Everest', 'Tokyo', 'Nile', 'Curie', 'Turing', 'Lisbon', 'Oslo']
+_entities = ['&amp;', '&nbsp;', '&eacute;', '&ndash;', '&#8212;', '&quot;']
+
+def write_synthetic_dump(path: pathlib.Path, pages: int, revisions: int = 1, markup: float = 0.3, seed: int = 0) -> None:
+    """
+    Writes a MediaWiki XML dump filled with made up articles
+    The same arguments always make the same file.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The .xml file to write
+    pages : int
+        The number of pages in the dump.
+        About 1 in 10 are not articles (talk pages, redirects, disambiguation) so they get filtered out.
+    revisions : int
+        The most revisions a page can have
+    markup : float
+        The chance each sentence gets a piece of markup: links, templates, tags, entities
+    seed : int
+        The seed for the random generator
+    """
+    rng = random.Random(seed)
+    revision_id = 1000
+    with open(path, 'w', encoding = 'utf-8', newline = '\n') as fp:
+        fp.write('<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" version="0.10" xml:lang="en">\n')
+        fp.write('  <siteinfo>\n    <sitename>Wikipedia</sitename>\n    <dbname>synthwiki</dbname>\n    <base>https://en.wikipedia.org/wiki/Main_Page</base>\n')
+        fp.write('    <generator>MediaWiki 1.40</generator>\n    <case>first-letter</case>\n    <namespaces>\n')
+        fp.write('      <namespace key="0" case="first-letter" />\n      <namespace key="1" case="first-letter">Talk</namespace>\n    </namespaces>\n  </siteinfo>\n')
+        for page_id in range(1, pages + 1):
+            kind = rng.random()
+            title = f'{rng.choice(_names)} {page_id}'
+            namespace = 1 if kind < 0.04 else 0
+            if 0.04 <= kind < 0.07:
+                title = f'{title} (disambiguation)'
+            fp.write(f'  <page>\n    <title>{escape(title)}</title>\n    <ns>{namespace}</ns>\n    <id>{page_id}</id>\n')
+            if 0.07 <= kind < 0.1:
+                fp.write(f'    <redirect title={quoteattr(rng.choice(_names))} />\n')
+            for _ in range(rng.randint(1, revisions)):
+                revision_id += 1
+                text = _article(rng, markup)
+                sha1 = hashlib.sha1(text.encode('utf-8')).hexdigest()
+                fp.write(f'    <revision>\n      <id>{revision_id}</id>\n      <timestamp>2023-01-01T00:00:00Z</timestamp>\n')
+                fp.write(f'      <contributor>\n        <username>Synth</username>\n        <id>1</id>\n      </contributor>\n')
+                fp.write(f'      <model>wikitext</model>\n      <format>text/x-wiki</format>\n')
+                fp.write(f'      <text bytes="{len(text.encode("utf-8"))}" xml:space="preserve">{escape(text)}</text>\n')
+                fp.write(f'      <sha1>{sha1}</sha1>\n    </revision>\n')
+            fp.write('  </page>\n')
+        fp.write('</mediawiki>\n')
+
+def write_synthetic_history(path: pathlib.Path, revisions: int, markup: float = 0.3, seed: int = 0) -> int:
+    """
+    Writes a MediaWiki XML dump with one article that has a very long history
+    Every revision has its own made up text, the last one is the one that is kept.
+    Returns the size in bytes of the largest revision text.
+    """
+    rng = random.Random(seed)
+    largest = 0
+    with open(path, 'w', encoding = 'utf-8', newline = '\n') as fp:
+        fp.write('<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" version="0.10" xml:lang="en">\n')
+        fp.write('  <siteinfo>\n    <sitename>Wikipedia</sitename>\n    <namespaces>\n      <namespace key="0" case="first-letter" />\n    </namespaces>\n  </siteinfo>\n')
+        fp.write(f'  <page>\n    <title>{rng.choice(_names)}</title>\n    <ns>0</ns>\n    <id>1</id>\n')
+        for revision_id in range(1, revisions + 1):
+            text = _article(rng, markup)
+            size = len(text.encode('utf-8'))
+            largest = max(largest, size)
+            fp.write(f'    <revision>\n      <id>{revision_id}</id>\n      <timestamp>2023-01-01T00:00:00Z</timestamp>\n')
+            fp.write(f'      <model>wikitext</model>\n      <format>text/x-wiki</format>\n')
+            fp.write(f'      <text bytes="{size}" xml:space="preserve">{escape(text)}</text>\n')
+            fp.write(f'      <sha1>{hashlib.sha1(text.encode("utf-8")).hexdigest()}</sha1>\n    </revision>\n')
+        fp.write('  </page>\n</mediawiki>\n')
+    return largest
+
+def _article(rng: random.Random, markup: float) -> str:
+    sections: t.List[str] = [_paragraph(rng, markup)]
+    for _ in range(rng.randint(0, 4)):
+        sections.append(f'== {rng.choice(_words).capitalize()} ==')
+        for _ in range(rng.randint(1, 3)):
+            sections.append(_paragraph(rng, markup))
+    for _ in range(rng.randint(0, 3)):
+        sections.append(f'[[Category:{rng.choice(_names)}]]')
+    return '\n\n'.join(sections)
+
+def _paragraph(rng: random.Random, markup: float) -> str:
+    sentences: t.List[str] = []
+    for _ in range(rng.randint(1, 6)):
+        words = [rng.choice(_words) for _ in range(rng.randint(4, 18))]
+        words[0] = words[0].capitalize()
+        if rng.random() < markup:
+            words.insert(rng.randrange(len(words)), _markup(rng))
+        sentences.append(' '.join(words) + rng.choice(['.', '.', '.', '!', '?']))
+    return ' '.join(sentences)
+
+def _markup(rng: random.Random) -> str:
+    name = rng.choice(_names)
+    kind = rng.randrange(9)
+    if kind == 0:
+        return f'[[{name}]]'
+    elif kind == 1:
+        return f'[[{name}|{rng.choice(_words)}]]'
+    elif kind == 2:
+        return f'{{{{cite web|url=https://example.org/{name}|title={name}}}}}'
+    elif kind == 3:
+        return f'<ref>{name} {rng.choice(_words)}</ref>'
+    elif kind == 4:
+        return f"'''{name}'''"
+    elif kind == 5:
+        return rng.choice(_entities)
+    elif kind == 6:
+        return f'[https://example.org/{name} {rng.choice(_words)}]'
+    elif kind == 7:
+        return f'[[File:{name}.jpg|thumb|{rng.choice(_words)} {name}]]'
+    else:
+        return f'<!-- {rng.choice(_words)} -->'
@@ -0,0 +1,171 @@
+import pathlib
+import queue
+import threading
+import time
+import typing as t
+from . import stats_helper
+
+T = t.TypeVar('T')
+
+_done = object()
+
+def read_ahead(chunks: t.Iterator[T], queue_size: int) -> t.Iterator[T]:
+    """
+    Gets the chunks on a background thread, keeping up to `queue_size` of them ready
+    The time spent waiting on the thread is recorded as `read_ahead_wait`, a large wait means the reads are the bottleneck.
+    An error in the thread is raised here, after the chunks that came before it.
+    When the consumer stops early, the thread stops and closes `chunks`.
+    """
+    ready: queue.Queue[t.Any] = queue.Queue(maxsize = queue_size)
+    stop = threading.Event()
+    def _produce() -> None:
+        try:
+            for chunk in chunks:
+                if not _put(ready, (chunk, None), stop):
+                    return
+            _put(ready, _done, stop)
+        except BaseException as error:
+            _put(ready, (None, error), stop)
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close() # type: ignore
+    thread = threading.Thread(target = _produce, daemon = True)
+    thread.start()
+    try:
+        while True:
+            start = time.perf_counter()
+            item = ready.get()
+            stats_helper.record('read_ahead_wait', time.perf_counter() - start)
+            if item is _done:
+                return
+            chunk, error = item
+            if error is not None:
+                raise error
+            yield chunk
+    finally:
+        stop.set()
+        thread.join()
+
+def _put(ready: 'queue.Queue[t.Any]', item: t.Any, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            ready.put(item, timeout = 0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+class WriteBehind:
+    """
+    Writes files on a background thread, so the caller only waits on the disk when `queue_size` blocks are already waiting
+    Each file gathers its writes into blocks of `block_size` bytes before handing them over.
+    The time spent waiting for room in the queue is recorded as `write_behind_wait`, a large wait means the writes are the bottleneck.
+    An error in the thread is raised by the next call that hands over a block.
+    """
+
+    def __init__(self, queue_size: int, block_size: int):
+        self._queue: queue.Queue[t.Any] = queue.Queue(maxsize = queue_size)
+        self._block_size = block_size
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(target = self._write, daemon = True)
+        self._thread.start()
+
+    def __enter__(self) -> 'WriteBehind':
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+    def open(self, path: pathlib.Path, mode: str) -> 'BehindFile':
+        """
+        Opens a binary file for writing, the file is opened right away so a bad path fails here
+        """
+        return BehindFile(self, open(path, mode), self._block_size)
+
+    def close(self) -> None:
+        """
+        Waits for everything handed over to be written
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise()
+
+    def _hand_over(self, action: str, fp: t.BinaryIO, data: t.Any = None) -> None:
+        self._raise()
+        start = time.perf_counter()
+        self._queue.put((action, fp, data))
+        stats_helper.record('write_behind_wait', time.perf_counter() - start, 1 if action == 'write' else 0, len(data) if action == 'write' else 0)
+
+    def _wait(self, action: str, fp: t.BinaryIO) -> None:
+        done = threading.Event()
+        self._hand_over(action, fp, done)
+        done.wait()
+        self._raise()
+
+    def _raise(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def _write(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            action, fp, data = item
+            try:
+                if self._error is None:
+                    if action == 'write':
+                        fp.write(data)
+                    elif action == 'flush':
+                        fp.flush()
+                    else:
+                        fp.close()
+            except BaseException as error:
+                self._error = error
+            finally:
+                if isinstance(data, threading.Event):
+                    data.set()
+
+class BehindFile:
+    """
+    A binary file written through a `WriteBehind`
+    `flush` waits until the thread has written and flushed everything handed over so far, after which `fileno` can be synced.
+    """
+
+    def __init__(self, owner: WriteBehind, fp: t.BinaryIO, block_size: int):
+        self._owner = owner
+        self._fp = fp
+        self._block_size = block_size
+        self._block = bytearray()
+        self._position = fp.tell()
+
+    def write(self, data: bytes) -> int:
+        self._block += data
+        self._position += len(data)
+        if len(self._block) >= self._block_size:
+            self._hand_over()
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def fileno(self) -> int:
+        return self._fp.fileno()
+
+    def flush(self) -> None:
+        self._hand_over()
+        self._owner._wait('flush', self._fp)
+
+    def close(self) -> None:
+        """
+        Hands the file over to be closed, without waiting for it
+        """
+        self._hand_over()
+        self._owner._hand_over('close', self._fp)
+
+    def _hand_over(self) -> None:
+        if len(self._block) > 0:
+            block = self._block
+            self._block = bytearray()
+            self._owner._hand_over('write', self._fp, block)
@@ -0,0 +1,191 @@
+import array
+import functools
+import importlib
+import mmap
+import os
+import pathlib
+import struct
+import sys
+import time
+import typing as t
+from . import index_helper, pool_helper, stats_helper
+
+Tokenizer = t.Callable[[str], t.Sequence[int]]
+Located = t.Tuple[int, int, int]
+
+_magic = b'WMTOKEN1'
+_header = struct.Struct('<8sqqqqq')
+_loaded: t.Dict[str, t.Tuple[Tokenizer, int]] = {}
+
+def load_tokenizer(name: str) -> t.Tuple[Tokenizer, int]:
+    """
+    Gets the tokenizer and the bytes each of its tokens takes
+    `bytes` stores the UTF-8 bytes of the text, 1 byte per token.
+    `module:function` imports a function that turns a string into token ids below 2^32, 4 bytes per token.
+    """
+    if name not in _loaded:
+        if name == 'bytes':
+            _loaded[name] = (_encode_bytes, 1)
+        elif ':' in name:
+            module, function = name.split(':', 1)
+            _loaded[name] = (getattr(importlib.import_module(module), function), 4)
+        else:
+            raise ValueError(f'{name} is not a tokenizer, use bytes or module:function')
+    return _loaded[name]
+
+def write_token_shards(folder: pathlib.Path, tokenizer: str, workers: int = 1) -> int:
+    """
+    Tokenizes each TXT file of a convert run into a binary shard with the same name ending in .tokens
+    The article index gives where each article starts and ends, so the TXT files are never guessed at.
+    Returns the number of tokens written.
+    """
+    files: t.Dict[int, t.List[Located]] = {}
+    with index_helper.ArticleIndex(folder) as index:
+        pattern = index.pattern
+        for page_id, file, offset, length in index.records():
+            files.setdefault(file, []).append((page_id, offset, length))
+    tasks = [(folder.joinpath(pattern.format(id = file)), sorted(located, key = lambda x: x[1])) for file, located in sorted(files.items())]
+    return sum(pool_helper.map_ordered(functools.partial(_write_task, tokenizer = tokenizer), tasks, workers))
+
+def _write_task(task: t.Tuple[pathlib.Path, t.List[Located]], tokenizer: str) -> int:
+    return write_tokens(task[0], task[1], tokenizer)
+
+def write_tokens(path: pathlib.Path, articles: t.List[Located], tokenizer: str) -> int:
+    """
+    Tokenizes one TXT file into its binary shard
+    `articles` are the page id, byte offset and byte length of each article in the file, in file order.
+    The title is the first paragraph of each article, a paragraph with no sentences when there is no title.
+    Returns the number of tokens written.
+
+    The shard is little endian and every array starts on 8 bytes.
+    The header is "WMTOKEN1" then the bytes per token and the number of tokens, sentences, paragraphs and articles, each 8 bytes.
+    After the header come the tokens, then the first token of each sentence, the first sentence of each paragraph and the first paragraph of each article.
+    Each of those 3 has 1 more entry than there are items, so item i ends where item i + 1 starts.
+    Last are the page ids of the articles.
+    """
+    start = time.perf_counter()
+    encode, size = load_tokenizer(tokenizer)
+    sentences = array.array('q', [0])
+    paragraphs = array.array('q', [0])
+    starts = array.array('q', [0])
+    ids = array.array('q')
+    tokens = 0
+    shard = path.with_suffix('.tokens')
+    temp = shard.with_name(f'{shard.name}.part')
+    with open(path, 'rb') as fp, open(temp, 'wb') as out:
+        data = mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ) if os.fstat(fp.fileno()).st_size > 0 else b''
+        out.write(_header.pack(_magic, size, 0, 0, 0, 0))
+        for page_id, offset, length in articles:
+            lines = data[offset:(offset + length)].decode('utf-8').splitlines()
+            i = 2 if len(lines) > 1 and lines[1] != '' else 1
+            for line in lines[1:i] + [''] + lines[(i + 1):]:
+                if line == '':
+                    paragraphs.append(len(sentences) - 1)
+                else:
+                    encoded = encode(line)
+                    out.write(encoded if size == 1 else _little_endian(array.array('I', encoded)).tobytes())
+                    tokens += len(encoded)
+                    sentences.append(tokens)
+            starts.append(len(paragraphs) - 1)
+            ids.append(page_id)
+        if isinstance(data, mmap.mmap):
+            data.close()
+        out.write(bytes(-out.tell() % 8))
+        for values in [sentences, paragraphs, starts, ids]:
+            _little_endian(values).tofile(out)
+        out.seek(0)
+        out.write(_header.pack(_magic, size, tokens, len(sentences) - 1, len(paragraphs) - 1, len(ids)))
+    os.replace(temp, shard)
+    stats_helper.record('write_tokens', time.perf_counter() - start, len(articles), tokens * size)
+    return tokens
+
+def _encode_bytes(text: str) -> bytes:
+    return text.encode('utf-8')
+
+def _little_endian(values: array.array) -> array.array:
+    if values.itemsize != {'I': 4, 'q': 8}[values.typecode]:
+        raise ValueError(f'{values.typecode} is not {values.itemsize} bytes on this platform')
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+class TokenShard:
+    """
+    Memory maps a binary shard so the tokens of an article, paragraph or sentence are sliced without copying
+    The slices are memoryviews into the map, they must be released before `close`.
+    The shard is little endian, so on a big endian machine the arrays are byte swapped into memory instead of being mapped.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        with open(path, 'rb') as fp:
+            self._map = mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, size, tokens, sentences, paragraphs, articles = _header.unpack_from(self._map, 0)
+        if magic != _magic:
+            raise ValueError(f'{path} is not a token shard')
+        view = memoryview(self._map)
+        position = _header.size
+        self._tokens = view[position:(position + tokens * size)].cast('B') if size == 1 else _cast(view, position, tokens, 'I')[0]
+        position += tokens * size
+        position += -position % 8
+        self._sentences, position = _cast(view, position, sentences + 1)
+        self._paragraphs, position = _cast(view, position, paragraphs + 1)
+        self._articles, position = _cast(view, position, articles + 1)
+        self._ids, position = _cast(view, position, articles)
+        view.release()
+
+    def __enter__(self) -> 'TokenShard':
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def tokens(self) -> memoryview:
+        return self._tokens
+    @property
+    def ids(self) -> memoryview:
+        return self._ids
+
+    def article(self, i: int) -> memoryview:
+        """
+        Gets the tokens of the i-th article, title included
+        """
+        return self._span(self._sentences[self._paragraphs[self._articles[i]]], self._sentences[self._paragraphs[self._articles[i + 1]]])
+
+    def paragraphs(self, i: int) -> range:
+        """
+        Gets the paragraph numbers of the i-th article, the first is its title
+        """
+        return range(self._articles[i], self._articles[i + 1])
+
+    def paragraph(self, j: int) -> memoryview:
+        return self._span(self._sentences[self._paragraphs[j]], self._sentences[self._paragraphs[j + 1]])
+
+    def sentences(self, j: int) -> range:
+        """
+        Gets the sentence numbers of the j-th paragraph
+        """
+        return range(self._paragraphs[j], self._paragraphs[j + 1])
+
+    def sentence(self, k: int) -> memoryview:
+        return self._span(self._sentences[k], self._sentences[k + 1])
+
+    def close(self) -> None:
+        for view in [self._tokens, self._sentences, self._paragraphs, self._articles, self._ids]:
+            view.release()
+        self._map.close()
+
+    def _span(self, start: int, end: int) -> memoryview:
+        return self._tokens[start:end]
+
+def _cast(view: memoryview, position: int, count: int, code: str = 'q') -> t.Tuple[memoryview, int]:
+    values = array.array(code)
+    end = position + count * values.itemsize
+    if sys.byteorder == 'little':
+        return view[position:end].cast(code), end
+    values.frombytes(view[position:end])
+    values.byteswap()
+    return memoryview(values), end
@@ -0,0 +1,96 @@
+import pathlib
+import pytest
+import random
+import typing as t
+from wikimedia import utils
+from wikimedia.dtypes import Convert as settings
+from wikimedia.modes import Convert
+
+def _token_loop(text: str) -> t.Iterator[str]:
+    """
+    The sentence splitter before it was moved to a precompiled pattern, kept to check the new one against
+    """
+    words = text.split()
+    st: int = 0
+    for i in range(0, len(words) - 1):
+        if words[i][-1] in Convert._eos:
+            if words[i + 1][0].isupper() or words[i + 1][0].isdigit():
+                yield ' '.join(words[st:(i + 1)])
+                st = i + 1
+    if st < len(words):
+        yield ' '.join(words[st:len(text)])
+
+@pytest.mark.parametrize('text', [
+    '',
+    '   ',
+    'One. Two! Three? four.',
+    'Ends with a stop.',
+    'Ends with all three!?.',
+    'Stop at the end. ',
+    'Stop at the end.\n',
+    'Wow!! Next one?! Then.',
+    'In 1999. 2000 came next.',
+    'Arabic digits. \u0663 after.',
+    'Non\u00a0breaking.\u00a0Space after.',
+    'Ideographic\u3000space.\u3000Next.',
+    'Em\u2003space.\u2003Next.',
+    'Line\u2028separator.\u2028Next.',
+    'Zero\u200bwidth.\u200bNext.',
+    'Accented. \u00c9lan and. \u00e9mile.',
+    'Title case. \u01c5 is not upper.',
+    'Tabs.\tAnd\nnew lines.\r\nHere.',
+    '. Starts with a stop. A',
+    '.',
+    '! ? .',
+    'a. b. C. d'
+])
+def test_split_sentences_matches_token_loop(text: str) -> None:
+    assert list(Convert._split_sentences(text)) == list(_token_loop(text))
+
+def test_split_sentences_matches_token_loop_on_random_text() -> None:
+    rng = random.Random(0)
+    alphabet = ['a', 'B', '\u00e9', '\u00c9', '1', '\u0663', '.', '!', '?', ' ', '  ', '\t', '\n', '\u00a0', '\u3000', '\u200b']
+    for _ in range(2000):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        assert list(Convert._split_sentences(text)) == list(_token_loop(text)), repr(text)
+
+def _convert(source: pathlib.Path, dest: pathlib.Path, resume: bool = False, **kwargs: t.Any) -> None:
+    dest.mkdir(exist_ok = True)
+    app = Convert(settings(source, dest, 50, 'wikimedia.{id:04}.txt', None, checkpoint = 7, resume = resume, quiet = True, **kwargs))
+    app.init()
+    app.run()
+
+def _output(dest: pathlib.Path) -> t.Dict[str, bytes]:
+    return {path.name: path.read_bytes() for path in sorted(dest.iterdir()) if path.suffix == '.txt' or path.name == utils.index_name}
+
+@pytest.fixture(scope = 'module')
+def dump(tmp_path_factory: pytest.TempPathFactory) -> t.Tuple[pathlib.Path, t.Dict[str, bytes]]:
+    folder = tmp_path_factory.mktemp('convert')
+    source = folder.joinpath('dump.xml')
+    utils.write_synthetic_dump(source, 300)
+    _convert(source, folder.joinpath('plain'))
+    return source, _output(folder.joinpath('plain'))
+
+@pytest.mark.parametrize('kwargs', [{'workers': 2}, {'shards': 3}, {'workers': 2, 'shards': 3}])
+def test_convert_is_the_same_in_parallel(tmp_path: pathlib.Path, dump: t.Tuple[pathlib.Path, t.Dict[str, bytes]], kwargs: t.Dict[str, int]) -> None:
+    source, expected = dump
+    _convert(source, tmp_path.joinpath('out'), **kwargs)
+    assert _output(tmp_path.joinpath('out')) == expected
+
+@pytest.mark.parametrize('kwargs', [{}, {'workers': 2}, {'shards': 3}])
+def test_convert_is_the_same_after_resume(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch, dump: t.Tuple[pathlib.Path, t.Dict[str, bytes]], kwargs: t.Dict[str, int]) -> None:
+    source, expected = dump
+    flatten = Convert._flatten_article
+    count = [0]
+    def interrupt(article: t.Any) -> t.Iterator[str]:
+        count[0] += 1
+        if count[0] == 123:
+            raise KeyboardInterrupt()
+        yield from flatten(article)
+    monkeypatch.setattr(Convert, '_flatten_article', staticmethod(interrupt))
+    with pytest.raises(KeyboardInterrupt):
+        _convert(source, tmp_path.joinpath('out'), **kwargs)
+    monkeypatch.setattr(Convert, '_flatten_article', staticmethod(flatten))
+    assert tmp_path.joinpath('out', Convert._checkpoint_name).exists()
+    _convert(source, tmp_path.joinpath('out'), resume = True, **kwargs)
+    assert _output(tmp_path.joinpath('out')) == expected
@@ -0,0 +1,34 @@
+import pytest
+from mwparserfromhell.parser import tokens # type: ignore
+from wikimedia.utils import extract_helper
+
+class _Revision:
+    def __init__(self, text: str):
+        self.text = text
+
+@pytest.mark.parametrize('text, expected', [
+    ('a <ref>note</ref> b', ['a note b']),
+    ('a<br/>b', ['ab']),
+    ('a <ref name="x" /> b', ['a  b']),
+    ("''it'' and '''bold'''", ['it and bold']),
+    ('{|\n|cell\n|}', ['cell']),
+    ('<table><tr><td>in</td></tr></table>', ['in']),
+    ('[[Link|shown]] and [[plain]]', ['Link and plain']),
+    ('[[File:a.jpg|thumb|caption]] after', ['after']),
+    ('[http://example.org site] &amp; more', ['site & more']),
+    ('{{template|x}}text', ['text']),
+    ('body\n\nCategory:A\nCategory:B', ['body']),
+    ('Category:A\nbody\nthumb', ['Category:A', 'body'])
+])
+def test_extract_text(text: str, expected: list) -> None:
+    assert extract_helper.extract_text(_Revision(text)) == expected
+
+def test_closing_tag_is_skipped_whole() -> None:
+    """
+    Each TagCloseClose is skipped by the TagOpenClose before it, so it has no handler of its own
+    """
+    text = '<ref>a</ref><table><tr><td>b</td></tr></table>'
+    token_list = extract_helper._Tokenizer().tokenize(text, 0, False)
+    assert any(type(token) is tokens.TagCloseClose for token in token_list)
+    assert tokens.TagCloseClose not in extract_helper._handlers
+    assert extract_helper._extract_text(token_list) == 'ab'
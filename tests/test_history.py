@@ -0,0 +1,45 @@
+import pathlib
+import tracemalloc
+import typing as t
+from wikimedia import utils
+from wikimedia.utils import fs_helper
+
+_revisions = 5000
+
+def _peak(read: t.Callable[[], int]) -> t.Tuple[int, int]:
+    tracemalloc.start()
+    try:
+        items = read()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return items, peak
+
+def _limit(largest: int) -> int:
+    """
+    A few read blocks plus a few copies of the largest revision, the same limit as the history benchmark
+    """
+    return 5 * fs_helper._block_size + 4 * largest
+
+def test_scan_history_is_bounded(tmp_path: pathlib.Path) -> None:
+    source = tmp_path.joinpath('history.xml')
+    largest = utils.write_synthetic_history(source, _revisions)
+    assert source.stat().st_size > _limit(largest)
+    items, peak = _peak(lambda: sum(1 for _ in utils.scan_revisions(source, text = True)))
+    assert items == 1
+    assert peak <= _limit(largest)
+
+def test_list_history_is_bounded(tmp_path: pathlib.Path) -> None:
+    source = tmp_path.joinpath('history.xml')
+    largest = utils.write_synthetic_history(source, _revisions)
+    items, peak = _peak(lambda: sum(1 for _ in utils.list_revisions(source)))
+    assert items == 1
+    assert peak <= _limit(largest)
+
+def test_history_keeps_last_revision(tmp_path: pathlib.Path) -> None:
+    source = tmp_path.joinpath('history.xml')
+    utils.write_synthetic_history(source, 50)
+    scanned = list(utils.scan_revisions(source, text = True))
+    listed = list(utils.list_revisions(source))
+    assert [revision.id for revision in scanned] == [revision.id for revision in listed] == [50]
+    assert scanned[0].text == listed[0].text